@@ -0,0 +1,224 @@
+"""Замеры времени и пиковой памяти этапов обработки на синтетических данных.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_pipeline.py                 # масштабы 10 и 100
+    python benchmarks/bench_pipeline.py --scales 1 10 100 1000
+    python benchmarks/bench_pipeline.py --json results.json
+
+Данные генерируются по образцу исходных CSV (benchmarks/synthetic.py): пункты × N,
+годы × min(N, 10). Для каждого масштаба этапы выполняются без интерфейса Streamlit;
+время — лучшее из --repeat повторов, память — пик tracemalloc за отдельный прогон.
+Если время или память этапа превышают порог из thresholds.json, скрипт завершается
+с кодом 1 — так прогон можно поставить в CI. Пороги заданы с запасом (примерно втрое
+по времени и в полтора раза по памяти от замеров на одном ядре) для масштабов 10 и 100;
+для масштабов без порогов выводится только отчёт.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from demography.catalog import build_figure  # noqa: E402
+from demography.correlations import CorrelationMatrix  # noqa: E402
+from demography.dataset import Artifacts, Dataset  # noqa: E402
+from demography.export import csv_zip_bytes, workbook_bytes  # noqa: E402
+from demography.figure_cache import figure_json  # noqa: E402
+from demography.forecast import ForecastTable  # noqa: E402
+from demography.loader import load_data, snapshot_path  # noqa: E402
+from demography.ranks import RankIndex  # noqa: E402
+from demography.registry import denominators, load_registry, of_kind  # noqa: E402
+from demography.regression import RegressionTable  # noqa: E402
+from demography.shares import ShareMatrix  # noqa: E402
+from demography.store import IndicatorStore  # noqa: E402
+
+from synthetic import generate  # noqa: E402
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+def stages(directory, files, registry):
+    """[(этап, функция)] конвейера; функции берут результаты предыдущих этапов из ctx."""
+    denominator = denominators(registry)[0]
+    topic = next(name for name in of_kind(registry, 'population') if registry[name].denominator)
+    other = of_kind(registry, 'housing')[0]
+    paths = {name: os.path.join(directory, file_name) for name, file_name in files.items()}
+
+    def parse(ctx):
+        ctx['frames'] = {name: load_data(path, use_snapshot=False) for name, path in paths.items()}
+
+    def snapshot_write(ctx):
+        # Первый load_data пишет Parquet-снимок рядом с CSV
+        for path in paths.values():
+            if os.path.exists(snapshot_path(path)):
+                os.remove(snapshot_path(path))
+            load_data(path)
+
+    def snapshot_read(ctx):
+        ctx['frames'] = {name: load_data(path) for name, path in paths.items()}
+
+    def store(ctx):
+        ctx['store'] = IndicatorStore.from_frames(ctx['frames'])
+
+    def shares(ctx):
+        ctx['shares'] = ShareMatrix(ctx['store'], denominator)
+
+    def ranks(ctx):
+        ctx['ranks'] = RankIndex(ctx['store'])
+
+    def correlations(ctx):
+        ctx['correlations'] = CorrelationMatrix(ctx['store'])
+
+    def regressions(ctx):
+        ctx['regressions'] = RegressionTable(ctx['store'])
+
+    def forecasts(ctx):
+        ctx['forecasts'] = ForecastTable(ctx['store'])
+
+    def dataset_build(ctx):
+        # Все артефакты через Dataset, как при старте приложения (CSV — из снимков)
+        dataset = Dataset(files, denominators(registry), directory=directory)
+        dataset.require(*files)
+        ctx['dataset'] = dataset
+
+    def refresh_one(ctx):
+        # Изменился один файл: перечитывается он один, артефакты обновляются по частям
+        path = paths[topic]
+        with open(path, 'ab') as f:
+            f.write(b'\r\n')
+        ctx['dataset'].refresh()
+
+    def state(ctx):
+        store = ctx['store']
+        return Artifacts(store, {denominator: ctx['shares']}, ctx['ranks'],
+                         ctx['correlations'], ctx['regressions'], ctx['forecasts'], {})
+
+    def figures(ctx):
+        s = state(ctx)
+        store = s.store
+        year, location = store.years[-1], store.locations[0]
+        for kind, inputs in [
+            ('share_line', (location, topic)),
+            ('share_bar', (year, topic)),
+            ('ratings', (year, topic, 5)),
+            ('correlation', (topic, other, year, location)),
+            ('corr_matrix', (year, tuple(store.indicators))),
+            ('share_line_forecast', (location, topic, 'holt')),
+            ('forecast_ratings', (s.forecasts.years[-1], topic, 5, 'holt')),
+        ]:
+            figure_json(build_figure(kind, s, registry, inputs))
+
+    def animations(ctx):
+        s = state(ctx)
+        years = tuple(s.store.years)
+        figure_json(build_figure('share_bar_anim', s, registry, (years, topic)))
+        figure_json(build_figure('correlation_anim', s, registry, (topic, other, years, s.store.locations[0])))
+
+    def export_excel(ctx):
+        store = ctx['store']
+        workbook_bytes({name: store.frame(name) for name in store.indicators})
+
+    def export_zip(ctx):
+        store = ctx['store']
+        csv_zip_bytes({name: store.frame(name) for name in store.indicators})
+
+    return [
+        ('parse_csv', parse),
+        ('snapshot_write', snapshot_write),
+        ('snapshot_read', snapshot_read),
+        ('store', store),
+        ('shares', shares),
+        ('ranks', ranks),
+        ('correlations', correlations),
+        ('regressions', regressions),
+        ('forecasts', forecasts),
+        ('dataset_build', dataset_build),
+        ('refresh_one', refresh_one),
+        ('figures', figures),
+        ('animations', animations),
+        ('export_excel', export_excel),
+        ('export_zip', export_zip),
+    ]
+
+
+def measure(func, ctx, repeat):
+    """(лучшее время, с; пик памяти, МБ). Память меряется отдельным прогоном под tracemalloc."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(ctx)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def run_scale(scale, registry, repeat, log):
+    """Результаты всех этапов для одного масштаба: {этап: {'seconds', 'peak_mb'}}."""
+    with tempfile.TemporaryDirectory(prefix=f'demography-bench-{scale}x-') as directory:
+        files = generate(directory, scale, registry)
+        ctx = {}
+        results = {}
+        for name, func in stages(directory, files, registry):
+            seconds, peak_mb = measure(func, ctx, repeat)
+            results[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak_mb, 2)}
+            log(f'{scale:>5}x  {name:<15} {seconds:9.3f} с  {peak_mb:9.1f} МБ')
+        store = ctx['store']
+        log(f'{scale:>5}x  ({len(store.locations)} пунктов, {len(store.years)} лет, '
+            f'{len(store.indicators)} показателей)')
+    return results
+
+
+def check(results, thresholds):
+    """Превышения порогов: [(масштаб, этап, метрика, значение, порог)]."""
+    failures = []
+    for scale, stage_results in results.items():
+        limits = thresholds.get(str(scale), {})
+        for stage, values in stage_results.items():
+            for metric, limit in limits.get(stage, {}).items():
+                if values[metric] > limit:
+                    failures.append((scale, stage, metric, values[metric], limit))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100],
+                        help='во сколько раз увеличить число пунктов (по умолчанию 10 и 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов для замера времени')
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH, help='пороги (JSON)')
+    parser.add_argument('--no-check', action='store_true', help='только отчёт, без проверки порогов')
+    parser.add_argument('--json', help='сохранить результаты в файл')
+    args = parser.parse_args(argv)
+
+    registry = load_registry()
+    results = {}
+    for scale in args.scales:
+        results[scale] = run_scale(scale, registry, args.repeat, print)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+    if args.no_check:
+        return 0
+    with open(args.thresholds, encoding='utf-8') as f:
+        thresholds = json.load(f)
+    failures = check(results, thresholds)
+    for scale, stage, metric, value, limit in failures:
+        print(f'ПРЕВЫШЕН ПОРОГ: {scale}x {stage} {metric} = {value} > {limit}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
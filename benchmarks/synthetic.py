@@ -0,0 +1,75 @@
+"""Синтетические CSV показателей в формате исходных выгрузок, увеличенные в N раз."""
+import os
+
+import numpy as np
+
+from demography.loader import data_path, load_data
+from demography.registry import load_registry
+from demography.store import is_year_column
+
+# Годы — четырёхзначные столбцы, поэтому их число растёт не больше чем в 10 раз
+MAX_YEAR_SCALE = 10
+
+
+def scaled_years(years, scale):
+    """Ряд лет, удлинённый в min(scale, MAX_YEAR_SCALE) раз и заканчивающийся последним годом."""
+    count = len(years) * min(scale, MAX_YEAR_SCALE)
+    last = int(years[-1])
+    return [str(year) for year in range(last - count + 1, last + 1)]
+
+
+def format_column(values, decimal, decimals):
+    """Числа -> строки как в исходном файле (десятичная запятая, пустые ячейки для NaN)."""
+    text = np.char.mod(f'%.{decimals}f', np.nan_to_num(values))
+    if decimal != '.':
+        text = np.char.replace(text, '.', decimal)
+    return np.where(np.isnan(values), '', text)
+
+
+def write_indicator(path, source, scale, seed):
+    """Пишет увеличенную копию показателя: пункты × scale, годы × min(scale, 10).
+
+    Каждый новый пункт — исходный со случайным множителем, годы продлеваются
+    назад с небольшим случайным трендом; кодировка, заголовок, отступы в названиях
+    и десятичный разделитель берутся из исходного файла.
+    """
+    rng = np.random.default_rng(seed)
+    df = load_data(source, use_snapshot=False)
+    report = df.attrs['ingest']
+    with open(data_path(source), 'rb') as f:
+        header = f.readline().decode(report['encoding']).lstrip('\ufeff').split(';')[0].strip()
+
+    years = [col for col in df.columns if is_year_column(col)]
+    base = df[years].to_numpy(dtype=float)
+    new_years = scaled_years(years, scale)
+
+    n = len(df) * scale
+    origin = np.arange(n) % len(df)
+    factor = rng.lognormal(0, 0.3, size=(n, 1))
+    # Тренд на год: значения за ранние годы получаются из первого известного года
+    trend = 1 + rng.normal(0, 0.01, size=(n, 1))
+    steps = np.arange(len(new_years) - len(years), 0, -1)
+    history = base[origin, :1] * trend ** -steps
+    values = np.hstack([history, base[origin]]) * factor
+    values = np.round(values, report['decimals'])
+
+    names = [f"{df['Name'][i]} №{k // len(df) + 1}" if k >= len(df) else df['Name'][i]
+             for k, i in enumerate(origin)]
+    columns = [format_column(values[:, j], report['decimal'], report['decimals']) for j in range(len(new_years))]
+    lines = [';'.join([header, *new_years])]
+    lines += ['  ' + ';'.join([name, *row]) for name, row in zip(names, zip(*columns))]
+
+    encoding = 'cp1251' if report['encoding'] in ('cp1251', 'windows-1251') else report['encoding']
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+
+
+def generate(directory, scale, registry=None, seed=0):
+    """Синтетические CSV всех показателей реестра в directory; возвращает {показатель: файл}."""
+    registry = registry or load_registry()
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for k, (name, indicator) in enumerate(registry.items()):
+        write_indicator(os.path.join(directory, indicator.file), indicator.file, scale, seed + k)
+        files[name] = indicator.file
+    return files
@@ -0,0 +1,4 @@
+"""Загрузка и аналитика демографических показателей Орловской области.
+
+Пакет не зависит от Streamlit: его используют и приложение, и служебные скрипты.
+"""
@@ -0,0 +1,68 @@
+import base64
+import io
+import os
+
+from PIL import Image
+
+from .loader import DATA_DIR, data_path
+
+# Каталог для раздачи через статический сервер Streamlit (server.enableStaticServing)
+STATIC_DIR = os.path.join(DATA_DIR, 'static')
+STATIC_URL = 'app/static'
+
+
+def webp_bytes(file_name, max_width, quality=75):
+    """Картинка, уменьшенная до ширины показа и пережатая в WebP."""
+    with Image.open(data_path(file_name)) as img:
+        if img.width > max_width:
+            height = round(img.height * max_width / img.width)
+            img = img.resize((max_width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format='WEBP', quality=quality, method=6)
+    return buffer.getvalue()
+
+
+def prepare_image(file_name, max_width, quality=75):
+    """Пишет WebP-версию картинки в STATIC_DIR (один раз на версию файла) и возвращает путь.
+
+    Ширина и качество входят в имя файла (fon-1920-q75.webp): картинки с другими
+    параметрами не подменяют друг друга. Если каталог только для чтения, возвращает
+    None — картинку тогда встраивают из памяти через image_data_url.
+    """
+    src = data_path(file_name)
+    stem = os.path.splitext(os.path.basename(src))[0]
+    dst = os.path.join(STATIC_DIR, f'{stem}-{max_width}-q{quality}.webp')
+    if os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+        return dst
+
+    data = webp_bytes(file_name, max_width, quality)
+    tmp = f'{dst}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, dst)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return None
+    return dst
+
+
+def static_url(path):
+    return f'{STATIC_URL}/{os.path.basename(path)}'
+
+
+def encode_data_url(data):
+    encoded = base64.b64encode(data).decode('utf-8')
+    return f'data:image/webp;base64,{encoded}'
+
+
+def data_url(path):
+    with open(path, 'rb') as f:
+        return encode_data_url(f.read())
+
+
+def image_data_url(file_name, max_width, quality=75):
+    """data URL картинки, пережатой в памяти (без записи на диск)."""
+    return encode_data_url(webp_bytes(file_name, max_width, quality))
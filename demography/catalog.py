@@ -0,0 +1,105 @@
+from collections import namedtuple
+
+from .forecast import METHODS
+
+from .figures import (
+    sunburst_figure, share_line_figure, share_bar_figure, rating_figures, correlation_figure,
+    correlation_heatmap_figure, share_bar_animation, correlation_animation, comparison_figure,
+    comparison_share_figure
+)
+
+# Пунктов в рейтинге по умолчанию
+DEFAULT_RATING_SIZE = 5
+
+# Вид графика: deps(registry, *входы) — показатели, от файлов которых он зависит;
+# build(state, registry, *входы) — Figure (или кортеж фигур, или None)
+FigureKind = namedtuple('FigureKind', 'deps build')
+
+
+def colors(registry):
+    return {name: indicator.color for name, indicator in registry.items()}
+
+
+def share_deps(registry, topic):
+    return topic, registry[topic].denominator
+
+
+def correlation_labels(registry, topic, other):
+    return registry[topic].label, registry[other].label, registry[other].short or other
+
+
+# Каталог графиков приложения. Его используют и скрипт Streamlit, и предрасчёт
+# (demography.precompute), поэтому ключи кэша фигур у них совпадают
+FIGURES = {
+    'sunburst': FigureKind(
+        lambda registry, location, year, topics: topics,
+        lambda state, registry, location, year, topics: sunburst_figure(
+            state.store, colors(registry), location, year, topics)
+    ),
+    'share_line': FigureKind(
+        lambda registry, location, topic: share_deps(registry, topic),
+        lambda state, registry, location, topic: share_line_figure(
+            state.shares[registry[topic].denominator], registry[topic].color, location, topic)
+    ),
+    'share_bar': FigureKind(
+        lambda registry, year, topic: share_deps(registry, topic),
+        lambda state, registry, year, topic: share_bar_figure(
+            state.shares[registry[topic].denominator], registry[topic].color, year, topic)
+    ),
+    'share_bar_anim': FigureKind(
+        lambda registry, years, topic: share_deps(registry, topic),
+        lambda state, registry, years, topic: share_bar_animation(
+            state.shares[registry[topic].denominator], registry[topic].color, years, topic)
+    ),
+    'share_line_forecast': FigureKind(
+        lambda registry, location, topic, method: share_deps(registry, topic),
+        lambda state, registry, location, topic, method: share_line_figure(
+            state.shares[registry[topic].denominator], registry[topic].color, location, topic,
+            state.forecasts.share_matrix(method, registry[topic].denominator), METHODS[method])
+    ),
+    'ratings': FigureKind(
+        lambda registry, year, topic, n: (topic,),
+        lambda state, registry, year, topic, n: rating_figures(state.ranks, year, topic, n)
+    ),
+    'forecast_ratings': FigureKind(
+        lambda registry, year, topic, n, method: (topic,),
+        lambda state, registry, year, topic, n, method: rating_figures(
+            state.forecasts.ranks[method], year, topic, n, " (прогноз)")
+    ),
+    'correlation': FigureKind(
+        lambda registry, topic, other, year, location: (topic, other),
+        lambda state, registry, topic, other, year, location: correlation_figure(
+            state.correlations, state.regressions, registry[topic].color, topic, other, year, location,
+            *correlation_labels(registry, topic, other))
+    ),
+    'correlation_anim': FigureKind(
+        lambda registry, topic, other, years, location: (topic, other),
+        lambda state, registry, topic, other, years, location: correlation_animation(
+            state.correlations, state.regressions, registry[topic].color, topic, other, years, location,
+            *correlation_labels(registry, topic, other))
+    ),
+    'corr_matrix': FigureKind(
+        lambda registry, year, indicators: indicators,
+        lambda state, registry, year, indicators: correlation_heatmap_figure(state.correlations, year, indicators)
+    ),
+    'comparison': FigureKind(
+        lambda registry, locations, year, topics: topics,
+        lambda state, registry, locations, year, topics: comparison_figure(
+            state.store, colors(registry), locations, year, topics)
+    ),
+    'comparison_shares': FigureKind(
+        lambda registry, locations, topic: share_deps(registry, topic),
+        lambda state, registry, locations, topic: comparison_share_figure(
+            state.shares[registry[topic].denominator], locations, topic)
+    ),
+}
+
+
+def figure_key(kind, versions, registry, inputs):
+    """Ключ кэша: (вид, версии файлов-зависимостей, входы секции)."""
+    deps = FIGURES[kind].deps(registry, *inputs)
+    return (kind, tuple(versions.get(name) for name in deps), *inputs)
+
+
+def build_figure(kind, state, registry, inputs):
+    return FIGURES[kind].build(state, registry, *inputs)
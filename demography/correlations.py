@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from .store import grow, replace_rows
+
+
+def pairwise_moments(values, rows=None):
+    """Попарные суммы для пар строк по последней оси с учётом пропусков.
+
+    values: массив (..., показатель, наблюдение) с NaN на месте пропусков.
+    Данные центрируются по каждому показателю (центры ``cx`` для x и ``cy`` для y),
+    затем для каждой пары (i, j) по наблюдениям, где есть оба значения, считаются
+    n, Σx, Σy, Σx², Σy², Σxy матричными произведениями за один проход.
+    Массивы сумм имеют форму (..., i, j): i — строки rows (по умолчанию все), j — все.
+    """
+    if rows is None:
+        rows = slice(None)
+    mask = ~np.isnan(values)
+    m = mask.astype(float)
+    # Центрируем: корреляция и наклон от сдвига не зависят, а точность выше
+    count = m.sum(axis=-1)
+    center = np.where(mask, values, 0.0).sum(axis=-1) / np.maximum(count, 1)
+    x = np.where(mask, values - center[..., np.newaxis], 0.0)
+    xr, mr = x[..., rows, :], m[..., rows, :]
+
+    def pair(a, b):
+        return np.einsum('...il,...jl->...ij', a, b)
+
+    return {
+        'n': pair(mr, m),
+        'sx': pair(xr, m),      # сумма x_i по наблюдениям, где есть и i, и j
+        'sy': pair(mr, x),
+        'sxx': pair(xr * xr, m),
+        'syy': pair(mr, x * x),
+        'sxy': pair(xr, x),
+        'cx': center[..., rows, np.newaxis],
+        'cy': center[..., np.newaxis, :],
+    }
+
+
+def transpose_moments(mo):
+    """Суммы для пар (j, i) из сумм для пар (i, j): x и y меняются ролями."""
+    t = lambda a: np.swapaxes(a, -1, -2)
+    return {
+        'n': t(mo['n']), 'sx': t(mo['sy']), 'sy': t(mo['sx']),
+        'sxx': t(mo['syy']), 'syy': t(mo['sxx']), 'sxy': t(mo['sxy']),
+        'cx': t(mo['cy']), 'cy': t(mo['cx']),
+    }
+
+
+def pairwise_corr(values, rows=None):
+    """Корреляции Пирсона между строками по последней оси (см. pairwise_moments).
+
+    Возвращает (corr, n) формы (..., строка rows, показатель); при n < 2 корреляция NaN.
+    """
+    mo = pairwise_moments(values, rows)
+    n = mo['n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * mo['sxy'] - mo['sx'] * mo['sy']
+        var = (n * mo['sxx'] - mo['sx'] ** 2) * (n * mo['syy'] - mo['sy'] ** 2)
+        corr = np.clip(cov / np.sqrt(var), -1.0, 1.0)
+    corr = np.where((n >= 2) & (var > 0), corr, np.nan)
+    return corr, n.astype(np.int32)
+
+
+class CorrelationMatrix:
+    """Матрицы корреляций всех пар показателей: по каждому году и по всем годам сразу.
+
+    ``by_year[year, i, j]`` — корреляция по пунктам за год,
+    ``pooled[i, j]`` — по всем парам (пункт, год), ``counts`` — число точек в паре.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        for name, array in self._compute(store).items():
+            setattr(self, name, array)
+
+    @staticmethod
+    def _compute(store, rows=None):
+        # (год, показатель, пункт)
+        per_year = np.moveaxis(store.values, 2, 0)
+        by_year, counts = pairwise_corr(per_year, rows)
+        n_ind = store.values.shape[0]
+        pooled, pooled_counts = pairwise_corr(store.values.reshape(n_ind, -1), rows)
+        return {'by_year': by_year, 'counts': counts, 'pooled': pooled, 'pooled_counts': pooled_counts}
+
+    def updated(self, store, changed):
+        """Новая матрица для store: пересчитываются только строки и столбцы показателей changed."""
+        if not store.extends(self.store):
+            return CorrelationMatrix(store)
+        rows = [store.indicator_id[name] for name in changed]
+        size = len(store.indicators)
+        result = object.__new__(CorrelationMatrix)
+        result.store = store
+        for name, block in self._compute(store, rows).items():
+            array = replace_rows(grow(getattr(self, name), size, axis=-1), rows, block, axis=-2, size=size)
+            array[..., :, rows] = np.swapaxes(block, -1, -2)
+            setattr(result, name, array)
+        return result
+
+    def corr(self, a, b, year=None):
+        i, j = self.store.indicator_id[a], self.store.indicator_id[b]
+        if year is None:
+            return self.pooled[i, j]
+        return self.by_year[self.store.year_id[year], i, j]
+
+    def matrix(self, year=None, indicators=None):
+        """Матрица корреляций как DataFrame (year=None — по всем годам)."""
+        indicators = list(indicators or self.store.indicators)
+        idx = [self.store.indicator_id[name] for name in indicators]
+        data = self.pooled if year is None else self.by_year[self.store.year_id[year]]
+        return pd.DataFrame(data[np.ix_(idx, idx)], index=indicators, columns=indicators)
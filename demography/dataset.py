@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import namedtuple
+
+from .correlations import CorrelationMatrix
+from .forecast import ForecastTable
+from .loader import load_data
+from .ranks import RankIndex
+from .regression import RegressionTable
+from .shares import ShareMatrix
+from .store import IndicatorStore
+from .watcher import DataWatcher
+
+# Согласованный снимок данных и всех производных артефактов;
+# shares — {знаменатель: ShareMatrix} для загруженных знаменателей
+Artifacts = namedtuple('Artifacts', 'store shares ranks correlations regressions forecasts versions')
+
+
+class Dataset:
+    """Хранилище и производные артефакты с ленивой загрузкой и инкрементальным обновлением.
+
+    Показатели читаются только после require(): пока их никто не запросил, файлы
+    не открываются. refresh() спрашивает у DataWatcher, какие из запрошенных файлов
+    изменились, перечитывает только их и пересчитывает в долях, рейтингах,
+    корреляциях, регрессиях и прогнозах только затронутые показатели; новые показатели
+    дописываются в конец. Новый набор артефактов подменяет старый целиком (``state``),
+    поэтому параллельные сессии всегда видят согласованный снимок.
+
+    Найденный в каталоге (discover) файл, который не разбирается как таблица
+    показателя, пропускается: причина лежит в ``errors``, пока файл не изменится.
+    Отсутствующий или испорченный файл из реестра прерывает загрузку — при каждом
+    refresh(), пока его не исправят: состояние файлов запоминается только после
+    успешного обновления.
+    """
+
+    def __init__(self, files, denominators=(), directory=None, discover=False):
+        kwargs = {'directory': directory} if directory else {}
+        self.watcher = DataWatcher(files, discover=discover, **kwargs)
+        self.denominators = list(denominators)
+        self.active = []              # запрошенные показатели в порядке запроса
+        self.errors = {}              # пропущенный найденный показатель -> причина
+        self.state = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_state(cls, state):
+        """Готовый набор артефактов (режим предрасчёта): CSV не читаются и не отслеживаются."""
+        dataset = cls({}, list(state.shares))
+        dataset.watcher = None
+        dataset.active = list(state.store.indicators)
+        dataset.state = state
+        return dataset
+
+    def available(self):
+        """Все показатели, которые можно запросить (включая найденные в каталоге)."""
+        if self.watcher is None:
+            return list(self.state.store.indicators)
+        return [name for name in self.watcher.current_files() if name not in self.errors]
+
+    def require(self, *indicators):
+        """Загружает ещё не запрошенные показатели; возвращает множество загруженных."""
+        with self._lock:
+            new = [name for name in indicators if name not in self.active]
+            if not new:
+                return set()
+            self.active.extend(dict.fromkeys(new))
+        return self.refresh()
+
+    def refresh(self):
+        """Подхватывает изменения запрошенных файлов; возвращает множество обновлённых показателей."""
+        with self._lock:
+            if self.watcher is None:
+                return set()
+            changed, removed = self.watcher.poll(self.active)
+            if not changed and not removed:
+                return set()
+            polled, gone = set(changed), set(removed)
+
+            previous = self.state
+            loaded = set() if previous is None else set(previous.store.indicators)
+            files = self.watcher.current_files()
+            frames = {}
+            for indicator in list(changed):
+                try:
+                    frames[indicator] = load_data(os.path.join(self.watcher.directory, files[indicator]))
+                    self.errors.pop(indicator, None)
+                except ValueError as e:
+                    if indicator in self.watcher.files:
+                        raise
+                    self.errors[indicator] = str(e)
+                    changed.discard(indicator)
+                    if indicator in loaded:
+                        removed.add(indicator)
+            for indicator in list(removed):
+                if indicator not in files:
+                    self.errors.pop(indicator, None)
+                if indicator not in loaded:
+                    removed.discard(indicator)    # пропущенный файл: в артефактах его не было
+            if not changed and not removed:
+                self.watcher.commit(polled, gone)
+                return set()
+            # Неизменённые показатели берутся из прежнего хранилища: frame() восстанавливает
+            # таблицу в том виде, в каком она была загружена, — отдельно таблицы не хранятся
+            for name in loaded - set(frames) - removed:
+                frames[name] = previous.store.frame(name)
+            store = IndicatorStore.from_frames({name: frames[name] for name in self.active if name in frames})
+
+            full = previous is None or bool(removed)
+            shares = {}
+            for denominator in self.denominators:
+                if denominator not in store.indicator_id:
+                    continue
+                matrix = None if full else previous.shares.get(denominator)
+                shares[denominator] = (ShareMatrix(store, denominator) if matrix is None
+                                       else matrix.updated(store, changed))
+            if full:
+                ranks = RankIndex(store)
+                correlations = CorrelationMatrix(store)
+                regressions = RegressionTable(store)
+                forecasts = ForecastTable(store)
+            else:
+                ranks = previous.ranks.updated(store, changed)
+                correlations = previous.correlations.updated(store, changed)
+                regressions = previous.regressions.updated(store, changed)
+                forecasts = previous.forecasts.updated(store, changed)
+
+            self.watcher.commit(polled, gone)
+            self.state = Artifacts(store, shares, ranks, correlations, regressions, forecasts,
+                                   self.watcher.versions())
+            return changed | removed
@@ -0,0 +1,63 @@
+import io
+import re
+import zipfile
+
+from openpyxl import Workbook
+
+# Символы, запрещённые в названиях листов Excel; длина названия — не больше 31
+SHEET_FORBIDDEN = re.compile(r'[\[\]:*?/\\]')
+# Символы, недопустимые в именах файлов
+FILE_FORBIDDEN = re.compile(r'[\\/:*?"<>|]')
+
+
+def file_stem(name):
+    return FILE_FORBIDDEN.sub('_', name).replace(' ', '_')
+
+
+def sheet_title(name, used):
+    title = SHEET_FORBIDDEN.sub('_', name)[:31]
+    base, i = title, 1
+    while title in used:
+        suffix = f'_{i}'
+        title = base[:31 - len(suffix)] + suffix
+        i += 1
+    used.add(title)
+    return title
+
+
+def csv_bytes(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def write_workbook(frames, fileobj):
+    """Пишет {название: DataFrame} в XLSX по листу на показатель в потоковом режиме.
+
+    Workbook(write_only=True) не держит в памяти дерево ячеек: строки листа уходят
+    во временный файл по мере записи. Готовая книга целиком пишется в fileobj.
+    """
+    wb = Workbook(write_only=True)
+    used = set()
+    for name, df in frames.items():
+        ws = wb.create_sheet(sheet_title(name, used))
+        ws.append(list(df.columns))
+        for row in df.itertuples(index=False, name=None):
+            ws.append([None if value != value else value for value in row])  # NaN -> пустая ячейка
+    wb.save(fileobj)
+
+
+def workbook_bytes(frames):
+    """XLSX в памяти: книга держится целиком (сжатой) и в таком виде попадает в кэш выгрузок."""
+    output = io.BytesIO()
+    write_workbook(frames, output)
+    return output.getvalue()
+
+
+def csv_zip_bytes(frames):
+    """ZIP с CSV-файлом на каждый показатель; файлы пишутся в архив по одному."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, df in frames.items():
+            with archive.open(f'{file_stem(name)}.csv', 'w') as f:
+                with io.TextIOWrapper(f, encoding='utf-8', newline='') as text:
+                    df.to_csv(text, index=False)
+    return output.getvalue()
@@ -0,0 +1,216 @@
+import gc
+import json
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+def figure_json(figures):
+    """Figure, кортеж фигур или None -> JSON-строки (формат каталога предрасчёта)."""
+    if figures is None:
+        return None
+    if isinstance(figures, tuple):
+        return tuple(figure_json(fig) for fig in figures)
+    return pio.to_json(figures, validate=False)
+
+
+def figure_from_json(specs):
+    """Обратно к figure_json: JSON-строки -> Figure без повторной проверки схемы.
+
+    JSON получен из уже проверенных фигур, а проверка словаря — самая дорогая
+    часть разбора (десятки миллисекунд на фигуру).
+    """
+    if specs is None:
+        return None
+    if isinstance(specs, tuple):
+        return tuple(figure_from_json(spec) for spec in specs)
+    return go.Figure(json.loads(specs), _validate=False)
+
+
+def json_size(specs):
+    """Длина JSON фигур в байтах — столько же уходит в браузер при показе."""
+    if specs is None:
+        return 0
+    if isinstance(specs, tuple):
+        return sum(json_size(spec) for spec in specs)
+    return len(specs)
+
+
+def approx_size(value):
+    """Оценка памяти под значение, байт: строки и bytes — по длине, кортежи — по элементам."""
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(approx_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    nbytes = getattr(value, 'nbytes', None)   # массивы NumPy
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+# Общие для процесса объекты: обход графа ссылок на них не идёт
+SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                types.MethodType, types.CodeType)
+
+
+def reachable(value, skip=()):
+    """{id: объект} для value и всего, на что оно ссылается (кроме классов, модулей, функций и skip)."""
+    seen = {}
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or id(obj) in skip or isinstance(obj, SHARED_TYPES):
+            continue
+        seen[id(obj)] = obj
+        stack.extend(gc.get_referents(obj))
+    return seen
+
+
+def deep_size(value, skip=()):
+    """Память под value вместе со всеми объектами, на которые оно ссылается, байт."""
+    return sum(sys.getsizeof(obj) for obj in reachable(value, skip).values())
+
+
+def shared_figure_objects():
+    """{id: объект}, общие для всех Figure процесса (валидаторы, шаблон оформления).
+
+    Это пересечение графов двух пустых фигур; объекты хранятся в словаре, чтобы их id
+    не достались другим объектам.
+    """
+    first, second = reachable(go.Figure()), reachable(go.Figure())
+    return {key: obj for key, obj in first.items() if key in second}
+
+
+class ResultCache:
+    """Общий для всех сессий процесса LRU-кэш неизменяемых результатов с лимитом памяти.
+
+    Ключ — (вид результата, версия данных, входы секции: пункт, год, категории).
+    Записи вытесняются по давности использования, пока их суммарный размер больше
+    max_bytes (и число больше maxsize, если он задан). Если несколько сессий
+    одновременно просят один ключ, результат строится один раз: остальные ждут его.
+    """
+
+    def __init__(self, max_bytes, maxsize=None):
+        self.max_bytes = max_bytes
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._items = OrderedDict()    # ключ -> (значение, размер)
+        self._building = {}            # ключ -> threading.Event
+        self._lock = threading.Lock()
+
+    def measure(self, value):
+        """Размер записи в байтах для лимита max_bytes."""
+        return approx_size(value)
+
+    def get_or_build(self, key, build):
+        """Значение по ключу; build() вызывается только при промахе и один раз на ключ."""
+        while True:
+            with self._lock:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return self._items[key][0]
+                event = self._building.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._building[key] = threading.Event()
+                    break
+            # Тот же результат уже строит другая сессия — ждём и читаем из кэша
+            event.wait()
+
+        try:
+            # Строим вне блокировки: разные результаты могут строиться параллельно
+            value = build()
+            self._store(key, value, self.measure(value))
+            return value
+        finally:
+            with self._lock:
+                del self._building[key]
+            event.set()
+
+    def _store(self, key, value, size):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items[key][1]
+            self._items[key] = (value, size)
+            self._items.move_to_end(key)
+            self.nbytes += size
+            self._evict()
+
+    def _evict(self):
+        # Последнюю запись не вытесняем: результат больше лимита всё равно отдаётся
+        while len(self._items) > 1 and (
+                self.nbytes > self.max_bytes or (self.maxsize and len(self._items) > self.maxsize)):
+            key, (_, size) = self._items.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+            self._forget(key)
+
+    def _forget(self, key):
+        """Вызывается под блокировкой для вытесненной записи."""
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class FigureCache(ResultCache):
+    """ResultCache для фигур: в кэше и наружу — готовые Figure (или кортежи фигур).
+
+    st.plotly_chart не меняет переданную Figure и не проверяет её заново (в отличие
+    от словаря), поэтому один экземпляр безопасно показывать во всех сессиях.
+    Размер записи — память под Figure со всеми её объектами (deep_size, без общих
+    для всех фигур); она в 4-17 раз больше JSON. Длина JSON — столько уходит
+    в браузер при показе — хранится отдельно (sent_size).
+
+    precomputed — фигуры каталога предрасчёта {ключ: JSON}. Они хранятся строками
+    и разбираются в Figure только при первом запросе ключа, после чего живут в кэше
+    и вытесняются наравне с построенными.
+    """
+
+    def __init__(self, max_bytes, maxsize=None, precomputed=None):
+        super().__init__(max_bytes, maxsize)
+        self.precomputed = precomputed or {}
+        self._shared = shared_figure_objects()
+        self._json_sizes = {}
+
+    def measure(self, value):
+        return deep_size(value, self._shared)
+
+    def get_or_build(self, key, build):
+        if key in self.precomputed:
+            # Фигура есть в каталоге предрасчёта: вместо построения — разбор её JSON
+            specs = self.precomputed[key]
+            build = lambda: figure_from_json(specs)
+        return super().get_or_build(key, build)
+
+    def _store(self, key, value, size):
+        specs = self.precomputed[key] if key in self.precomputed else figure_json(value)
+        with self._lock:
+            self._json_sizes[key] = json_size(specs)
+        super()._store(key, value, size)
+
+    def _forget(self, key):
+        del self._json_sizes[key]
+
+    def sent_size(self, key):
+        """Длина JSON записи в байтах; 0, если её нет."""
+        with self._lock:
+            return self._json_sizes.get(key, 0)
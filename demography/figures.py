@@ -0,0 +1,466 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# 1. ДИАГРАММА "СОЛНЕЧНЫЕ ЛУЧИ" (SUNBURST)
+def sunburst_figure(store, colors, location, year, topics):
+    # Подготовка данных для sunburst
+    sunburst_data = {
+        'labels': [location, *topics],
+        'parents': ['', *[location]*len(topics)],
+        'values': [],
+        'marker': {'colors': []}
+    }
+
+    # Получаем значения для каждого показателя
+    for topic in topics:
+        value = store.value(topic, location, year)
+        if np.isnan(value):
+            value = 0
+
+        sunburst_data['values'].append(float(value))
+        sunburst_data['marker']['colors'].append(colors[topic])
+
+    # Добавляем корневой элемент (общее значение)
+    sunburst_data['values'].insert(0, sum(sunburst_data['values']))
+    sunburst_data['marker']['colors'].insert(0, '#636EFA')  # Цвет для корневого элемента
+
+    fig = go.Figure(go.Sunburst(
+        labels=sunburst_data['labels'],
+        parents=sunburst_data['parents'],
+        values=sunburst_data['values'],
+        branchvalues="total",
+        marker=sunburst_data['marker'],
+        textinfo="label+percent parent+value",
+        hovertemplate='<b>%{label}</b><br>' +
+                     'Численность: %{value:,}<br>' +
+                     'Доля: %{percentParent:.1%}',
+        insidetextorientation='radial'
+    ))
+
+    fig.update_layout(
+        margin=dict(t=30, l=0, r=0, b=0),
+        height=600,
+        title_text=f"Структура населения в {location} ({year} год)",
+        title_x=0.5
+    )
+    return fig
+
+
+# 2. График долей для выбранного пункта
+def share_line_figure(shares, color, location, topic, forecast=None, method_label=None):
+    # Доли посчитаны заранее для всех пунктов и лет (ShareMatrix);
+    # forecast — ShareMatrix по годам прогноза (ForecastTable.share_matrix)
+    percentages = shares.series(topic, location)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=shares.store.years,
+        y=percentages,
+        name=f"{topic} (%)",
+        line=dict(color=color, width=3),
+        mode='lines+markers',
+        hovertemplate="<b>%{x}</b><br>%{y:.2f}%<extra></extra>"
+    ))
+
+    if forecast is not None:
+        # Прогноз продолжает линию от последнего года с данными
+        known = np.flatnonzero(~np.isnan(shares.store.series(topic, location)))
+        start = [] if known.size == 0 else [known[-1]]
+        projected = forecast.series(topic, location)
+        fig.add_trace(go.Scatter(
+            x=[shares.store.years[k] for k in start] + forecast.store.years,
+            y=np.concatenate([percentages[start], projected]),
+            name=f"Прогноз: {method_label}" if method_label else "Прогноз",
+            line=dict(color=color, width=3, dash='dash'),
+            mode='lines+markers',
+            hovertemplate="<b>%{x}</b><br>%{y:.2f}% (прогноз)<extra></extra>"
+        ))
+
+    fig.update_layout(
+        xaxis_title="Год",
+        yaxis_title="Процент от общей численности",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+# 3. График долей по всем населённым пунктам
+def share_bar_figure(shares, color, year, topic):
+    # Доли, порядок и среднее берутся из готовых матриц
+    idx, values = shares.ranked_column(topic, year)
+    locations = np.asarray(shares.store.locations, dtype=object)
+    merged = pd.DataFrame({'Name': locations[idx], 'Доля (%)': values})
+
+    fig = px.bar(
+        merged,
+        x='Name',
+        y='Доля (%)',
+        color_discrete_sequence=[color],
+        labels={'Name': 'Населённый пункт', 'Доля (%)': 'Доля (%)'},
+        height=600
+    )
+
+    fig.update_layout(
+        xaxis_title="Населённый пункт",
+        yaxis_title=f"Доля {topic} от общей численности (%)",
+        xaxis={'categoryorder':'total descending'},
+        hovermode="x",
+        showlegend=False
+    )
+
+    mean_val = shares.year_mean(topic, year)
+    fig.add_hline(
+        y=mean_val,
+        line_dash="dot",
+        line_color="gray",
+        annotation_text=f"Среднее: {mean_val:.2f}%",
+        annotation_position="bottom right"
+    )
+    return fig
+
+
+# 4. Рейтинги Топ-N
+def rating_figures(ranks, year, topic, n=5, title_suffix=""):
+    # Порядок пунктов берётся из готового индекса рейтингов (RankIndex);
+    # для прогноза это индекс по годам прогноза (ForecastTable.ranks)
+    column = ranks.store.column(topic, year)
+    locations = np.asarray(ranks.store.locations, dtype=object)
+    height = max(300, 40 * n + 100)
+
+    # Равные значения на обоих графиках — в порядке файла
+    top_idx = ranks.top(topic, year, n)
+    top_idx = top_idx[np.argsort(column[top_idx], kind='stable')]
+    top = pd.DataFrame({'Name': locations[top_idx], year: column[top_idx]})
+    fig_top = px.bar(
+        top,
+        x=year,
+        y='Name',
+        orientation='h',
+        title=f"🏆 Топ-{n} по {topic}{title_suffix}",
+        color_discrete_sequence=['#2ca02c'],
+        height=height
+    )
+
+    bottom_idx = ranks.bottom(topic, year, n)
+    bottom_idx = bottom_idx[np.argsort(-column[bottom_idx], kind='stable')]
+    bottom = pd.DataFrame({'Name': locations[bottom_idx], year: column[bottom_idx]})
+    fig_bottom = px.bar(
+        bottom,
+        x=year,
+        y='Name',
+        orientation='h',
+        title=f"⚠️ Антирейтинг по {topic}{title_suffix}",
+        color_discrete_sequence=['#d62728'],
+        height=height
+    )
+    return fig_top, fig_bottom
+
+
+# 5-6. Корреляция категории населения с жильём или инвестициями
+def trendline_traces(fit, x, color):
+    """Линия регрессии и 95% доверительная полоса обычными трассами (без statsmodels)."""
+    grid = np.linspace(np.min(x), np.max(x), 50)
+    lower, upper = fit.band(grid)
+    return [
+        go.Scatter(
+            x=np.concatenate([grid, grid[::-1]]),
+            y=np.concatenate([upper, lower[::-1]]),
+            fill='toself',
+            fillcolor=color,
+            opacity=0.15,
+            line=dict(width=0),
+            hoverinfo='skip',
+            name="95% интервал",
+            showlegend=False
+        ),
+        go.Scatter(
+            x=grid[[0, -1]],
+            y=fit.predict(grid[[0, -1]]),
+            mode='lines',
+            line=dict(color=color, width=2),
+            name="Линия тренда",
+            hovertemplate=(f"y = {fit.slope:.4g}·x + {fit.intercept:.4g}<br>"
+                           f"R² = {fit.r2:.3f}<extra></extra>"),
+            showlegend=False
+        ),
+    ]
+
+
+def correlation_figure(correlations, regressions, color, topic, other, year, location,
+                       topic_label, other_label, other_short):
+    """Диаграмма рассеяния topic × other за год; None, если точек меньше двух."""
+    store = correlations.store
+    pop_values = store.column(topic, year)
+    other_values = store.column(other, year)
+
+    # Оставляем только пункты, где есть оба значения
+    mask = ~np.isnan(pop_values) & ~np.isnan(other_values)
+    if mask.sum() < 2:
+        return None
+
+    locations = np.asarray(store.locations, dtype=object)
+    merged = pd.DataFrame({
+        'Name': locations[mask],
+        f'{year}_pop': pop_values[mask],
+        f'{year}_other': other_values[mask]
+    })
+
+    # Коэффициент берётся из готовой матрицы корреляций
+    corr = correlations.corr(topic, other, year)
+
+    # Создаем график рассеяния
+    fig = px.scatter(
+        merged,
+        x=f'{year}_pop',
+        y=f'{year}_other',
+        hover_data=['Name'],
+        labels={
+            f'{year}_pop': topic_label,
+            f'{year}_other': other_label
+        },
+        color_discrete_sequence=[color]
+    )
+
+    # Линия тренда из готовой таблицы регрессий
+    fit = regressions.fit(topic, other, year)
+    if fit is not None:
+        fig.add_traces(trendline_traces(fit, merged[f'{year}_pop'], color))
+
+    # Добавляем информацию о корреляции
+    fig.update_layout(
+        title=f"Коэффициент корреляции: {corr:.2f}",
+        height=600
+    )
+
+    # Добавляем точку для выбранного населенного пункта
+    loc_id = store.location_id[location]
+    if mask[loc_id]:
+        fig.add_trace(go.Scatter(
+            x=[pop_values[loc_id]],
+            y=[other_values[loc_id]],
+            mode='markers',
+            marker=dict(
+                color='red',
+                size=12,
+                line=dict(width=2, color='black')
+            ),
+            name=f"Выбранный пункт: {location}",
+            hoverinfo='text',
+            hovertext=f"{location}<br>{topic}: {pop_values[loc_id]:.2f}<br>{other_short}: {other_values[loc_id]:.2f}"
+        ))
+    return fig
+
+
+# 7. Матрица корреляций всех показателей
+def correlation_heatmap_figure(correlations, year=None, indicators=None):
+    """Тепловая карта корреляций за год (year=None — по всем годам) в порядке indicators."""
+    matrix = correlations.matrix(year, indicators)
+    fig = go.Figure(go.Heatmap(
+        z=matrix.values,
+        x=matrix.columns,
+        y=matrix.index,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        text=np.round(matrix.values, 2),
+        texttemplate="%{text}",
+        hovertemplate="%{y} × %{x}<br>r = %{z:.3f}<extra></extra>"
+    ))
+    fig.update_layout(
+        height=600,
+        yaxis={'autorange': 'reversed'},
+        title_text="Коэффициенты корреляции Пирсона " + (f"({year} год)" if year else "(все годы)"),
+        title_x=0.5
+    )
+    return fig
+
+
+# 8. Сравнение нескольких пунктов: обе фигуры строятся из одного среза values
+def comparison_figure(store, colors, locations, year, topics):
+    """Категории topics за год рядом для каждого пункта из locations (группы столбцов)."""
+    values = store.rows(topics, locations)[:, :, store.year_id[year]]
+    fig = go.Figure([
+        go.Bar(
+            x=list(locations),
+            y=values[k],
+            name=topic,
+            marker_color=colors[topic],
+            hovertemplate=f"<b>%{{x}}</b><br>{topic}: %{{y:,}}<extra></extra>"
+        )
+        for k, topic in enumerate(topics)
+    ])
+    fig.update_layout(
+        barmode='group',
+        height=500,
+        title_text=f"Категории населения по пунктам ({year} год)",
+        title_x=0.5,
+        xaxis_title="Населённый пункт",
+        yaxis_title="Численность",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        template="plotly_white"
+    )
+    return fig
+
+
+def comparison_share_figure(shares, locations, topic):
+    """Доля topic по годам: линия на каждый пункт из locations."""
+    store = shares.store
+    i = store.indicator_id[topic]
+    rows = [store.location_id[location] for location in locations]
+    values = shares.shares[i][rows]
+    fig = go.Figure([
+        go.Scatter(
+            x=store.years,
+            y=values[k],
+            name=location,
+            mode='lines+markers',
+            hovertemplate=f"<b>{location}</b><br>%{{x}}: %{{y:.2f}}%<extra></extra>"
+        )
+        for k, location in enumerate(locations)
+    ])
+    fig.update_layout(
+        xaxis_title="Год",
+        yaxis_title=f"Доля {topic} от общей численности (%)",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        height=500,
+        template="plotly_white"
+    )
+    return fig
+
+
+# Анимация по годам: все кадры строятся за один проход по срезу лет и отправляются
+# одной фигурой — браузер переключает годы сам, без перезапуска скрипта
+def animation_controls(fig, years, duration=800):
+    """Кнопки «пуск/пауза» и ползунок лет для фигуры с кадрами по годам."""
+    play = dict(frame=dict(duration=duration, redraw=True), transition=dict(duration=duration // 2),
+                fromcurrent=True, mode='immediate')
+    pause = dict(frame=dict(duration=0, redraw=False), mode='immediate')
+    fig.update_layout(
+        updatemenus=[dict(
+            type='buttons',
+            direction='left',
+            x=0, y=-0.15, xanchor='left', yanchor='top',
+            buttons=[
+                dict(label='▶', method='animate', args=[None, play]),
+                dict(label='⏸', method='animate', args=[[None], pause]),
+            ]
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.1, y=-0.15, len=0.9, yanchor='top',
+            currentvalue=dict(prefix='Год: '),
+            steps=[dict(label=year, method='animate',
+                        args=[[year], dict(frame=dict(duration=0, redraw=True), mode='immediate')])
+                   for year in years]
+        )]
+    )
+    return fig
+
+
+def share_bar_animation(shares, color, years, topic):
+    """Доли topic по пунктам с кадром на каждый год из years (порядок — по доле в кадре)."""
+    store = shares.store
+    i = store.indicator_id[topic]
+    cols = [store.year_id[year] for year in years]
+    idx = np.flatnonzero(shares.mask[i])
+    locations = np.asarray(store.locations, dtype=object)[idx]
+
+    # Срезы всех лет сразу: (пункт, год)
+    values = shares.shares[i][np.ix_(idx, cols)]
+    ranks = shares.rank[i][np.ix_(idx, cols)]
+    means = shares.mean[i, cols]
+    order = np.argsort(np.where(ranks > 0, ranks, len(store.locations) + 1), axis=0, kind='stable')
+    y_max = np.nanmax(values) * 1.05 if values.size else 1
+
+    frames = []
+    for k, year in enumerate(years):
+        ordered = order[:, k]
+        mean_val = means[k]
+        frames.append(go.Frame(
+            name=year,
+            data=[go.Bar(x=locations[ordered], y=values[ordered, k], marker_color=color,
+                         hovertemplate="<b>%{x}</b><br>%{y:.2f}%<extra></extra>")],
+            layout=go.Layout(
+                title_text=f"{year} год",
+                shapes=[dict(type='line', xref='paper', x0=0, x1=1, y0=mean_val, y1=mean_val,
+                             line=dict(color='gray', dash='dot'))],
+                annotations=[dict(xref='paper', x=1, y=mean_val, xanchor='right', yanchor='top',
+                                  showarrow=False, text=f"Среднее: {mean_val:.2f}%")]
+            )
+        ))
+
+    fig = go.Figure(data=frames[0].data, layout=frames[0].layout, frames=frames)
+    fig.update_layout(
+        height=600,
+        xaxis_title="Населённый пункт",
+        yaxis_title=f"Доля {topic} от общей численности (%)",
+        yaxis_range=[0, y_max],
+        hovermode="x",
+        showlegend=False
+    )
+    return animation_controls(fig, years)
+
+
+def correlation_animation(correlations, regressions, color, topic, other, years, location,
+                          topic_label, other_label, other_short):
+    """Рассеяние topic × other с кадром на каждый год; None, если ни в одном году нет двух точек."""
+    store = correlations.store
+    cols = [store.year_id[year] for year in years]
+    # (показатель, пункт, год) для пары показателей и всех лет диапазона
+    values = store.values[[store.indicator_id[topic], store.indicator_id[other]]][:, :, cols]
+    mask = ~np.isnan(values).any(axis=0)
+    if mask.sum(axis=0).max(initial=0) < 2:
+        return None
+
+    # Общие оси на все кадры, чтобы движение точек было видно
+    x_all, y_all = values[0][mask], values[1][mask]
+    pad_x = (x_all.max() - x_all.min()) * 0.05 or 1
+    pad_y = (y_all.max() - y_all.min()) * 0.05 or 1
+    locations = np.asarray(store.locations, dtype=object)
+    loc_id = store.location_id[location]
+    empty = go.Scatter(x=[], y=[], showlegend=False)
+
+    frames = []
+    for k, year in enumerate(years):
+        m = mask[:, k]
+        x, y = values[0, m, k], values[1, m, k]
+        data = [go.Scatter(
+            x=x, y=y, mode='markers', text=locations[m],
+            marker=dict(color=color, size=9),
+            hovertemplate=f"<b>%{{text}}</b><br>{topic_label}: %{{x}}<br>{other_label}: %{{y}}<extra></extra>",
+            showlegend=False
+        )]
+        fit = regressions.fit(topic, other, year) if m.sum() >= 2 else None
+        data += trendline_traces(fit, x, color) if fit is not None else [empty, empty]
+        if m[loc_id]:
+            data.append(go.Scatter(
+                x=[values[0, loc_id, k]], y=[values[1, loc_id, k]],
+                mode='markers',
+                marker=dict(color='red', size=12, line=dict(width=2, color='black')),
+                name=f"Выбранный пункт: {location}",
+                hoverinfo='text',
+                hovertext=(f"{location}<br>{topic}: {values[0, loc_id, k]:.2f}<br>"
+                           f"{other_short}: {values[1, loc_id, k]:.2f}")
+            ))
+        else:
+            data.append(empty)
+        corr = correlations.corr(topic, other, year)
+        frames.append(go.Frame(
+            name=year, data=data,
+            layout=go.Layout(title_text=f"{year} год — коэффициент корреляции: {corr:.2f}")
+        ))
+
+    fig = go.Figure(data=frames[0].data, layout=frames[0].layout, frames=frames)
+    fig.update_layout(
+        height=600,
+        xaxis=dict(title=topic_label, range=[x_all.min() - pad_x, x_all.max() + pad_x]),
+        yaxis=dict(title=other_label, range=[y_all.min() - pad_y, y_all.max() + pad_y])
+    )
+    return animation_controls(fig, years)
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+
+from .ranks import RankIndex
+from .shares import ShareMatrix
+from .store import IndicatorStore, replace_rows
+
+# На сколько лет вперёд строится прогноз
+HORIZON = 3
+# Методы прогноза и их названия для интерфейса
+METHODS = {
+    'linear': 'Линейный тренд',
+    'holt': 'Экспоненциальное сглаживание (Хольт)',
+}
+# Сетка параметров сглаживания Хольта: для каждого ряда выбирается пара
+# с наименьшей суммой квадратов ошибок прогноза на шаг вперёд
+ALPHAS = np.linspace(0.1, 0.9, 9)
+BETAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5])
+# Рядов в одном проходе Хольта: сетка параметров умножает память на число пар
+HOLT_CHUNK = 2048
+
+
+def projected_years(years, horizon=HORIZON):
+    """Годы прогноза: следующие horizon лет после последнего известного."""
+    if not years:
+        return []
+    last = int(years[-1])
+    return [str(last + k) for k in range(1, horizon + 1)]
+
+
+def linear_trend(values):
+    """(наклон, сдвиг) МНК-прямой по известным годам для каждого ряда values[..., год].
+
+    Ряд из одного значения даёт горизонтальную прямую, пустой — NaN.
+    """
+    valid = ~np.isnan(values)
+    t = np.arange(values.shape[-1], dtype=float)
+    y = np.where(valid, values, 0)
+    n = valid.sum(axis=-1)
+    st, sy = (valid * t).sum(axis=-1), y.sum(axis=-1)
+    stt, sty = (valid * t ** 2).sum(axis=-1), (y * t).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        den = n * stt - st ** 2
+        slope = np.where(den > 0, (n * sty - st * sy) / den, 0.0)
+        intercept = np.where(n > 0, (sy - slope * st) / n, np.nan)
+    return slope, intercept
+
+
+def linear_forecast(values, horizon=HORIZON):
+    """Прогноз values[..., год] на horizon лет продолжением линейного тренда."""
+    slope, intercept = linear_trend(values)
+    future = np.arange(values.shape[-1], values.shape[-1] + horizon, dtype=float)
+    return intercept[..., np.newaxis] + slope[..., np.newaxis] * future
+
+
+def holt_forecast(values, horizon=HORIZON, alphas=ALPHAS, betas=BETAS):
+    """Прогноз values[..., год] линейным экспоненциальным сглаживанием Хольта.
+
+    Все пары (alpha, beta) из сетки и до HOLT_CHUNK рядов считаются одним проходом
+    по годам; пропуск в ряду не обновляет уровень, а сдвигает его на тренд. Начальный
+    уровень — первое известное значение, начальный тренд — наклон линейного тренда ряда.
+
+    При тех же alpha, beta и начальном состоянии рекурсия совпадает с
+    statsmodels Holt (initialization_method='known', initial_level = y0 - тренд).
+    Параметры же выбираются по сетке, а не оптимизатором statsmodels, поэтому
+    прогноз Holt(...).fit() на коротких шумных рядах может заметно отличаться.
+    """
+    series = values.reshape(-1, values.shape[-1])
+    forecast = np.empty((len(series), horizon))
+    for start in range(0, len(series), HOLT_CHUNK):
+        chunk = slice(start, start + HOLT_CHUNK)
+        forecast[chunk] = holt_chunk(series[chunk], horizon, alphas, betas)
+    return forecast.reshape(*values.shape[:-1], horizon)
+
+
+def holt_chunk(series, horizon, alphas, betas):
+    slope, _ = linear_trend(series)
+    alpha, beta = (grid.reshape(-1, 1) for grid in np.meshgrid(alphas, betas, indexing='ij'))
+
+    level = np.full((alpha.size, len(series)), np.nan)
+    trend = np.broadcast_to(slope, level.shape).copy()
+    sse = np.zeros(level.shape)
+    for y in series.T:
+        known = ~np.isnan(y)
+        started = ~np.isnan(level)
+        predicted = level + trend
+        update = known & started
+        error = np.where(update, y - predicted, 0)
+        sse += error ** 2
+        new_level = np.where(update, predicted + alpha * error, predicted)
+        trend = np.where(update, trend + beta * (new_level - level - trend), trend)
+        # Ряд начинается с первого известного значения
+        level = np.where(known & ~started, y, new_level)
+
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(len(series))
+    level, trend = level[best, columns], trend[best, columns]
+    return level[:, np.newaxis] + trend[:, np.newaxis] * np.arange(1, horizon + 1)
+
+
+FORECASTERS = {
+    'linear': linear_forecast,
+    'holt': holt_forecast,
+}
+
+
+def forecast_values(values, method, horizon=HORIZON):
+    """Прогноз массива values[..., год]; отрицательные значения обрезаются до нуля."""
+    return np.maximum(FORECASTERS[method](values, horizon), 0)
+
+
+class ForecastTable:
+    """Прогнозы всех показателей для всех пунктов, построенные одним проходом на версию данных.
+
+    Для каждого метода из METHODS ``stores[method]`` — IndicatorStore с теми же
+    показателями и пунктами, но годами прогноза (``years``), а ``ranks[method]`` —
+    RankIndex по нему, так что рейтинги и графики прогноза строятся теми же функциями,
+    что и по фактическим данным. Доли прогноза (share_matrix) считаются по запросу
+    знаменателя и запоминаются.
+    """
+
+    def __init__(self, store, horizon=HORIZON):
+        self.store = store
+        self.horizon = horizon
+        self.years = projected_years(store.years, horizon)
+        self._build({method: forecast_values(store.values, method, horizon) for method in METHODS})
+
+    def _build(self, values):
+        self.stores = {
+            method: IndicatorStore(self.store.indicators, self.store.locations, self.years, array,
+                                   municipalities=self.store.municipalities)
+            for method, array in values.items()
+        }
+        self.ranks = {method: RankIndex(store) for method, store in self.stores.items()}
+        self._shares = {}
+        self._lock = threading.Lock()
+
+    def updated(self, store, changed):
+        """Новая таблица для store, где заново прогнозируются только показатели changed."""
+        if not store.extends(self.store):
+            return ForecastTable(store, self.horizon)
+        rows = [store.indicator_id[name] for name in changed]
+        size = len(store.indicators)
+        result = object.__new__(ForecastTable)
+        result.store, result.horizon, result.years = store, self.horizon, self.years
+        result._build({
+            method: replace_rows(self.stores[method].values, rows,
+                                 forecast_values(store.values[rows], method, self.horizon), size=size)
+            for method in METHODS
+        })
+        return result
+
+    def __getstate__(self):
+        # Блокировка и запомненные доли в снимок (предрасчёт) не попадают
+        state = dict(self.__dict__)
+        del state['_lock'], state['_shares']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shares = {}
+        self._lock = threading.Lock()
+
+    def series(self, method, indicator, location):
+        """Прогноз показателя по годам прогноза для одного пункта."""
+        return self.stores[method].series(indicator, location)
+
+    def share_matrix(self, method, denominator):
+        """ShareMatrix прогноза: доли прогноза показателей от прогноза знаменателя."""
+        with self._lock:
+            matrix = self._shares.get((method, denominator))
+            if matrix is None:
+                matrix = self._shares[method, denominator] = ShareMatrix(self.stores[method], denominator)
+            return matrix
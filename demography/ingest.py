@@ -0,0 +1,190 @@
+import codecs
+import re
+
+import chardet
+import numpy as np
+import pandas as pd
+
+# Пробелы, которыми в выгрузках разделяют разряды ("1 234 567")
+THOUSANDS_SPACES = re.compile(r'[\s  ]')
+INT32_MAX = np.iinfo(np.int32).max
+# Целые до 2^24 представимы во float32 без потерь
+FLOAT32_EXACT = 2 ** 24
+# Дробные с d знаками восстанавливаются из float32 округлением до d знаков, пока
+# |x|·10^d < 2^23: ошибка float32 (не больше |x|·2^-24) меньше половины последнего знака
+FLOAT32_ROUNDTRIP = 2 ** 23
+# Строк, по ячейкам которых определяются разделители: выборки хватает
+SEPARATOR_SAMPLE_ROWS = 200
+# Больше знаков после запятой в float64 не бывает
+MAX_DECIMALS = 17
+
+
+def detect_encoding(raw):
+    """Кодировка файла: BOM, затем строгий UTF-8, затем chardet, иначе cp1251."""
+    if raw.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        raw.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    detected = chardet.detect(raw[:10000])['encoding']
+    if detected:
+        try:
+            raw.decode(detected)
+            return detected
+        except (UnicodeDecodeError, LookupError):
+            pass
+    return 'cp1251'
+
+
+def detect_separators(cells):
+    """(десятичный, разрядный) разделители по числовым ячейкам файла.
+
+    Если в ячейке есть и точка, и запятая — десятичный тот, что правее.
+    Одна запятая считается десятичной, если за ней не ровно три цифры
+    или если в файле больше нигде нет точек (так пишут в российских выгрузках).
+    """
+    cells = [THOUSANDS_SPACES.sub('', c) for c in cells if c]
+    comma_decimal = point_decimal = 0
+    for cell in cells:
+        if ',' in cell and '.' in cell:
+            if cell.rfind(',') > cell.rfind('.'):
+                comma_decimal += 1
+            else:
+                point_decimal += 1
+        elif ',' in cell:
+            if cell.count(',') == 1 and not re.search(r',\d{3}$', cell):
+                comma_decimal += 1
+            elif cell.count(',') > 1:
+                point_decimal += 1
+        elif '.' in cell:
+            if cell.count('.') > 1:
+                comma_decimal += 1
+            else:
+                point_decimal += 1
+    if comma_decimal > point_decimal:
+        return ',', '.'
+    if point_decimal > 0:
+        return '.', ','
+    # Только целые или "1,234": без точек в файле запятую трактуем как десятичную
+    if any(',' in cell for cell in cells):
+        return ',', '.'
+    return '.', ','
+
+
+def sample_cells(df, value_columns, rows=SEPARATOR_SAMPLE_ROWS):
+    """Текстовые ячейки первых rows строк: по ним определяются разделители."""
+    head = df[value_columns].head(rows).to_numpy(dtype=object).ravel(order='F')
+    return [cell.strip() for cell in head if isinstance(cell, str)]
+
+
+def grouped_pattern(decimal, thousands):
+    """Число с разрядным разделителем строго между группами из трёх цифр: 1,234,567.8."""
+    return re.compile(rf'[+-]?\d{{1,3}}(?:{re.escape(thousands)}\d{{3}})+(?:{re.escape(decimal)}\d*)?')
+
+
+def normalize_numeric(values, decimal, thousands):
+    """Строки -> float64; возвращает (числа, маска отвергнутых непустых ячеек).
+
+    Простые числа разбираются одним векторным проходом; ячейки с пробелами и
+    разрядными разделителями — отдельно (parse_grouped). Разрядный разделитель
+    убирается только из правильно сгруппированных чисел: ячейка вроде "1,5" в файле
+    с десятичной точкой отвергается, а не читается как 15.
+    """
+    text = values.fillna('').astype(str)
+    # Разрядный разделитель заменяется недопустимым символом, чтобы такие ячейки
+    # не разобрались как простые числа и прошли проверку группировки
+    plain = text.str.translate(str.maketrans({thousands: 'x', decimal: '.'}))
+    numbers = pd.to_numeric(plain, errors='coerce').astype(float)
+    rejected = pd.Series(False, index=text.index)
+    rest = numbers.isna() & (text != '')
+    if rest.any():
+        cells = text[rest].str.strip()
+        parsed = parse_grouped(cells, decimal, thousands)
+        numbers[rest] = parsed
+        rejected[rest] = (parsed.isna() & (cells != '')).to_numpy()
+    return numbers, rejected
+
+
+def parse_grouped(cells, decimal, thousands):
+    """Ячейки с пробелами и разрядными разделителями -> float64 (NaN, если не число)."""
+    cleaned = cells.str.replace(THOUSANDS_SPACES, '', regex=True)
+    has_thousands = cleaned.str.contains(thousands, regex=False)
+    grouped = cleaned.str.fullmatch(grouped_pattern(decimal, thousands))
+    cleaned = cleaned.mask(has_thousands & ~grouped, '')
+    cleaned = cleaned.str.replace(thousands, '', regex=False)
+    if decimal != '.':
+        cleaned = cleaned.str.replace(decimal, '.', regex=False)
+    return pd.to_numeric(cleaned.replace('', np.nan), errors='coerce').astype(float)
+
+
+def compact_dtype(numbers, decimals=0):
+    """Минимальный тип без потери точности: int32 для целых без пропусков, иначе float32/float64.
+
+    decimals — знаков после запятой в файле: float32 берётся, только если из него
+    значения восстанавливаются точно округлением до decimals знаков.
+    """
+    finite = numbers.dropna()
+    if finite.empty:
+        return np.float32
+    integral = bool((finite == np.round(finite)).all())
+    max_abs = finite.abs().max()
+    if integral and len(finite) == len(numbers) and max_abs <= INT32_MAX:
+        return np.int32
+    if integral and max_abs > FLOAT32_EXACT:
+        return np.float64
+    if not integral and max_abs * 10 ** decimals >= FLOAT32_ROUNDTRIP:
+        return np.float64
+    return np.float32
+
+
+def count_decimals(numbers):
+    """Наименьшее число знаков после запятой, которым записываются все значения.
+
+    x записывается d знаками, если совпадает с ближайшим к round(x·10^d)/10^d
+    числом float64 — это и проверяется: деление на 10^d (d ≤ 22) округляется точно.
+    """
+    finite = numbers[np.isfinite(numbers)]
+    for decimals in range(MAX_DECIMALS):
+        scale = 10.0 ** decimals
+        if (np.round(finite * scale) / scale == finite).all():
+            return decimals
+    return MAX_DECIMALS
+
+
+def normalize_frame(df, value_columns, separators=None):
+    """Приводит столбцы значений к числам одного файла; возвращает (DataFrame, отчёт).
+
+    separators — (десятичный, разрядный), если уже известны: parse_csv определяет их
+    по первым строкам и сразу читает числа через read_csv, сюда приходят уже числовые
+    столбцы и строковые — те, где есть пробелы, разряды или не числа. Иначе
+    разделители определяются по первым строкам df.
+
+    В отчёте: разделители, число знаков после запятой (по нему float32
+    восстанавливается в точные float64) и список отвергнутых ячеек (Name, столбец, текст).
+    """
+    if separators is None:
+        separators = detect_separators(sample_cells(df, value_columns))
+    decimal, thousands = separators
+    rejected = []
+    columns = {}
+    for col in value_columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            columns[col] = df[col].astype(float)
+            continue
+        numbers, bad = normalize_numeric(df[col], decimal, thousands)
+        for name, raw in zip(df.loc[bad, 'Name'], df.loc[bad, col]):
+            rejected.append([name, col, raw])
+        columns[col] = numbers
+    values = [numbers.to_numpy() for numbers in columns.values()]
+    decimals = count_decimals(np.concatenate(values)) if values else 0
+    for col, numbers in columns.items():
+        df[col] = numbers.astype(compact_dtype(numbers, decimals))
+    report = {
+        'decimal': decimal,
+        'thousands': thousands,
+        'decimals': decimals,
+        'rejected': rejected,
+    }
+    return df, report
@@ -0,0 +1,123 @@
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .ingest import SEPARATOR_SAMPLE_ROWS, detect_encoding, detect_separators, normalize_frame, sample_cells
+
+# Каталог с исходными CSV (корень репозитория)
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Версия формата снимков: увеличить при изменении логики разбора CSV
+SNAPSHOT_VERSION = 5
+SNAPSHOT_KEY = b'demography.source'
+REPORT_KEY = b'demography.ingest'
+
+
+def data_path(file_name):
+    if os.path.isabs(file_name):
+        return file_name
+    return os.path.join(DATA_DIR, file_name)
+
+
+def snapshot_path(path):
+    return path + '.parquet'
+
+
+def source_key(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns, 'version': SNAPSHOT_VERSION}
+
+
+def read_snapshot(path, key):
+    """Читает Parquet-снимок, если он построен из той же версии CSV, иначе None."""
+    try:
+        table = pq.read_table(snapshot_path(path))
+    except (OSError, pa.ArrowException):
+        return None
+    metadata = table.schema.metadata or {}
+    try:
+        stored = json.loads(metadata.get(SNAPSHOT_KEY, b'null'))
+    except ValueError:
+        return None
+    if stored != key:
+        return None
+    df = table.to_pandas()
+    df.attrs['ingest'] = json.loads(metadata.get(REPORT_KEY, b'{}'))
+    return df
+
+
+def write_snapshot(path, key, df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SNAPSHOT_KEY] = json.dumps(key).encode('utf-8')
+    metadata[REPORT_KEY] = json.dumps(df.attrs.get('ingest', {}), ensure_ascii=False).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+    # Пишем во временный файл и подменяем атомарно, чтобы параллельные реплики
+    # не прочитали недописанный снимок
+    tmp_path = f'{snapshot_path(path)}.{os.getpid()}.tmp'
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, snapshot_path(path))
+    except OSError:
+        # Каталог только для чтения — работаем без снимка
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_data(file_name, use_snapshot=True):
+    """Загружает CSV показателя; повторные запуски читают типизированный Parquet-снимок."""
+    path = data_path(file_name)
+    if not use_snapshot:
+        return parse_csv(path)
+    key = source_key(path)
+    df = read_snapshot(path, key)
+    if df is None:
+        df = parse_csv(path)
+        write_snapshot(path, key, df)
+    return df
+
+
+def column_name(col):
+    """Имя столбца без пробелов и BOM; столбец названий называется Name."""
+    col = col.strip().lstrip('\ufeff')
+    return 'Name' if col == 'Наименование муниципального образования' else col
+
+
+def parse_csv(path):
+    """Разбирает CSV: кодировка и разделители определяются по файлу.
+
+    Разделители определяются по первым строкам, затем числа разбирает read_csv;
+    столбцы, где он встретил пробелы, разряды или не числа, доразбирает
+    normalize_frame. Столбцы лет приводятся к компактным числовым типам
+    (int32/float32), отчёт о кодировке, разделителях и отвергнутых ячейках
+    кладётся в df.attrs['ingest'].
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    encoding = detect_encoding(raw)
+    text = raw.decode(encoding)
+    head = pd.read_csv(io.StringIO(text), sep=';', dtype=str, keep_default_na=False, nrows=SEPARATOR_SAMPLE_ROWS)
+    names = {col: column_name(col) for col in head.columns}
+    if 'Name' not in names.values():
+        raise ValueError(f'{os.path.basename(path)}: нет столбца с названиями муниципальных образований')
+    years = [col for col in head.columns if names[col].isdigit() and len(names[col]) == 4]
+    separators = detect_separators(sample_cells(head, years))
+
+    # Пустые ячейки лет — пропуски, остальные столбцы читаются как текст
+    df = pd.read_csv(io.StringIO(text), sep=';', decimal=separators[0],
+                     dtype={col: str for col in head.columns if col not in years},
+                     keep_default_na=False, na_values={col: [''] for col in years},
+                     float_precision='round_trip')
+    df = df.rename(columns=names)
+    df['Name'] = df['Name'].str.strip()
+    df = df[df['Name'] != ''].reset_index(drop=True)
+
+    df, report = normalize_frame(df, [names[col] for col in years], separators)
+    report['encoding'] = encoding
+    df.attrs['ingest'] = report
+    return df
@@ -0,0 +1,115 @@
+import difflib
+import re
+import unicodedata
+
+# Кириллица: по ней видно, прочиталось ли название в правильной кодировке
+CYRILLIC = re.compile('[а-яё]', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+QUOTES = re.compile('[«»"\'“”„]')
+# Обозначения типа муниципалитета и их каноническая форма в ключе
+KIND_PATTERNS = [
+    (re.compile(r'^(?:г\.|г(?=\s)|город)\s*'), 'г. '),
+    (re.compile(r'\s*(?:муниципальный\s+район|муниципальный\s+округ|м\.\s*р\.|мр|р-н|район)$'), ' район'),
+]
+
+
+def repair_mojibake(name):
+    """Восстанавливает название, прочитанное в чужой кодировке (UTF-8 как cp1251 или cp1251 как latin-1)."""
+    # Обычный текст в cp1251 почти никогда не образует корректный UTF-8, а испорченный — образует
+    try:
+        repaired = name.encode('cp1251').decode('utf-8')
+        if repaired != name and CYRILLIC.search(repaired):
+            return repaired
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    if not CYRILLIC.search(name):
+        try:
+            repaired = name.encode('latin-1').decode('cp1251')
+            if CYRILLIC.search(repaired):
+                return repaired
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return name
+
+
+def normalize_name(name):
+    """Ключ сопоставления: одинаков для написаний одного муниципалитета в разных файлах.
+
+    Чинит кодировку, приводит регистр, ё -> е, кавычки и пробелы, а обозначения
+    типа ("город", "г.", "р-н", "муниципальный район", "м.р.") — к одной форме.
+    """
+    key = unicodedata.normalize('NFKC', repair_mojibake(str(name)))
+    key = QUOTES.sub('', key).casefold().replace('ё', 'е')
+    key = SPACES.sub(' ', key).strip()
+    for pattern, replacement in KIND_PATTERNS:
+        key = pattern.sub(replacement, key)
+    return key.strip()
+
+
+class MunicipalityIndex:
+    """Канонический справочник муниципалитетов: целые id, ключи и все встреченные написания.
+
+    Название для показа — первое встреченное написание; остальные написания с тем же
+    ключом (normalize_name) становятся псевдонимами и указывают на тот же id,
+    поэтому данные разных файлов склеиваются по id, а не по строкам.
+    """
+
+    def __init__(self, names=()):
+        self.names = []        # id -> название для показа
+        self.keys = []         # id -> ключ
+        self.key_id = {}       # ключ -> id
+        self.aliases = {}      # написание -> id
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """id муниципалитета (новый, если ключ ещё не встречался)."""
+        municipality_id = self.aliases.get(name)
+        if municipality_id is not None:
+            return municipality_id
+        key = normalize_name(name)
+        municipality_id = self.key_id.get(key)
+        if municipality_id is None:
+            municipality_id = self.key_id[key] = len(self.names)
+            self.names.append(repair_mojibake(name).strip())
+            self.keys.append(key)
+        self.aliases[name] = municipality_id
+        return municipality_id
+
+    def resolve(self, name):
+        """id по любому написанию; None, если такого муниципалитета нет."""
+        municipality_id = self.aliases.get(name)
+        if municipality_id is None:
+            municipality_id = self.key_id.get(normalize_name(name))
+        return municipality_id
+
+    def search(self, query, limit=None, cutoff=0.6):
+        """id муниципалитетов по запросу: сначала по началу названия или слова,
+        потом по вхождению, потом нечётко (опечатки); пустой запрос — все."""
+        query = normalize_name(query) if query else ''
+        if not query:
+            ids = list(range(len(self.names)))
+        else:
+            prefix, word, substring = [], [], []
+            for i, key in enumerate(self.keys):
+                bare = key.removeprefix('г. ')
+                if key.startswith(query) or bare.startswith(query):
+                    prefix.append(i)
+                elif any(part.startswith(query) for part in key.split()):
+                    word.append(i)
+                elif query in key:
+                    substring.append(i)
+            ids = prefix + word + substring
+            if not ids:
+                # Нечёткое совпадение с ключом или с любым его словом
+                scores = []
+                for i, key in enumerate(self.keys):
+                    score = max(difflib.SequenceMatcher(None, query, part).ratio()
+                                for part in [key, *key.split()])
+                    if score >= cutoff:
+                        scores.append((-score, i))
+                ids = [i for _, i in sorted(scores)]
+        return ids[:limit] if limit else ids
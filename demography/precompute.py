@@ -0,0 +1,200 @@
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import os
+import pickle
+import sys
+import time
+from collections import namedtuple
+
+from .catalog import DEFAULT_RATING_SIZE, build_figure, figure_key
+from .dataset import Dataset
+from .figure_cache import figure_json
+from .forecast import METHODS
+from .registry import REGISTRY_PATH, build_registry, defaults, denominators, load_registry, of_kind
+
+# Версия формата каталога артефактов: увеличить при изменении состава файлов
+ARTIFACTS_VERSION = 6
+MANIFEST_FILE = 'manifest.json'
+STATE_FILE = 'state.pkl'
+FIGURES_FILE = 'figures.pkl'
+
+# Предрасчитанный каталог: реестр, артефакты Dataset, {ключ кэша: JSON фигуры}, манифест
+Precomputed = namedtuple('Precomputed', 'registry state figures manifest')
+
+
+def figure_inputs(state, registry, rating_size=DEFAULT_RATING_SIZE):
+    """Все (вид, входы) графиков, которые приложение запрашивает при настройках по умолчанию.
+
+    Перебираются все пункты, годы и категории; солнечные лучи — для набора по умолчанию
+    и для каждой категории отдельно, анимации — по всему диапазону лет, прогнозы —
+    для каждого метода.
+    """
+    store = state.store
+    years = tuple(store.years)
+    loaded = lambda names: [name for name in names if name in store.indicator_id]
+    population = loaded(of_kind(registry, 'population'))
+    share_topics = [name for name in population if registry[name].denominator in state.shares]
+    others = loaded(of_kind(registry, 'housing') + of_kind(registry, 'investment'))
+    selected = tuple(loaded(defaults(registry)))
+    indicators = tuple(store.indicators)
+
+    for location in store.locations:
+        for year in years:
+            if selected:
+                yield 'sunburst', (location, year, selected)
+            for topic in population:
+                yield 'sunburst', (location, year, (topic,))
+        for topic in share_topics:
+            yield 'share_line', (location, topic)
+        for topic in population:
+            for other in others:
+                for year in years:
+                    yield 'correlation', (topic, other, year, location)
+                if len(years) > 1:
+                    yield 'correlation_anim', (topic, other, years, location)
+    for year in years:
+        for topic in share_topics:
+            yield 'share_bar', (year, topic)
+        for topic in population:
+            yield 'ratings', (year, topic, rating_size)
+        yield 'corr_matrix', (year, indicators)
+    yield 'corr_matrix', (None, indicators)
+    if len(years) > 1:
+        for topic in share_topics:
+            yield 'share_bar_anim', (years, topic)
+    # Прогнозы: линия долей для каждого пункта и рейтинги по каждому году прогноза
+    for method in METHODS:
+        for location in store.locations:
+            for topic in share_topics:
+                yield 'share_line_forecast', (location, topic, method)
+        for year in state.forecasts.years:
+            for topic in population:
+                yield 'forecast_ratings', (year, topic, rating_size, method)
+
+
+def build_dataset(registry, directory=None):
+    """Dataset со всеми показателями реестра и каталога данных (в порядке реестра)."""
+    files = {name: indicator.file for name, indicator in registry.items()}
+    dataset = Dataset(files, denominators(registry), directory=directory, discover=True)
+    dataset.require(*registry, *dataset.available())
+    return dataset
+
+
+# Состояние процесса-исполнителя при параллельной сборке фигур
+_worker = {}
+
+
+def _init_worker(state, registry):
+    _worker['state'], _worker['registry'] = state, registry
+
+
+def _build_chunk(chunk):
+    state, registry = _worker['state'], _worker['registry']
+    return [figure_json(build_figure(kind, state, registry, inputs)) for kind, inputs in chunk]
+
+
+def build_figures(state, registry, rating_size=DEFAULT_RATING_SIZE, jobs=1, log=None):
+    """{ключ кэша: JSON} для всех графиков из figure_inputs; jobs > 1 — в нескольких процессах."""
+    log = log or (lambda message: None)
+    tasks = {}
+    for kind, inputs in figure_inputs(state, registry, rating_size):
+        tasks.setdefault(figure_key(kind, state.versions, registry, inputs), (kind, inputs))
+    keys, specs = list(tasks), list(tasks.values())
+
+    if jobs <= 1:
+        _init_worker(state, registry)
+        chunks = map(_build_chunk, (specs[i:i + 100] for i in range(0, len(specs), 100)))
+        return dict(zip(keys, (spec for chunk in chunks for spec in chunk)))
+
+    # Построение фигур упирается в процессор: делим список на куски по исполнителям
+    size = max(len(specs) // (jobs * 4), 1)
+    chunks = [specs[i:i + size] for i in range(0, len(specs), size)]
+    built = []
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                                initargs=(state, registry)) as pool:
+        for chunk in pool.map(_build_chunk, chunks):
+            built.extend(chunk)
+            log(f'Фигур: {len(built)} из {len(specs)}')
+    return dict(zip(keys, built))
+
+
+def write_file(path, data):
+    """Атомарная запись: читатель видит либо старый файл, либо новый целиком."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def precompute(out_dir, registry, directory=None, rating_size=DEFAULT_RATING_SIZE, jobs=1, log=None):
+    """Строит все артефакты и фигуры и пишет их в out_dir; возвращает манифест."""
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    dataset = build_dataset(registry, directory)
+    state = dataset.state
+    for indicator, error in dataset.errors.items():
+        log(f'Пропущен файл показателя {indicator}: {error}')
+    log(f'Данные: {len(state.store.indicators)} показателей, {len(state.store.locations)} пунктов, '
+        f'{len(state.store.years)} лет ({time.perf_counter() - started:.1f} с)')
+
+    figures = build_figures(state, registry, rating_size, jobs, log)
+    log(f'Фигур: {len(figures)} ({time.perf_counter() - started:.1f} с)')
+
+    manifest = {
+        'version': ARTIFACTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'registry': [dataclasses.asdict(indicator) for indicator in registry.values()],
+        'indicators': state.store.indicators,
+        'skipped': dataset.errors,
+        'versions': state.versions,
+        'rating_size': rating_size,
+        'figures': len(figures),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    write_file(os.path.join(out_dir, STATE_FILE), pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    write_file(os.path.join(out_dir, FIGURES_FILE), pickle.dumps(figures, protocol=pickle.HIGHEST_PROTOCOL))
+    # Манифест пишется последним: по нему загрузчик понимает, что каталог готов
+    write_file(os.path.join(out_dir, MANIFEST_FILE),
+               json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+    return manifest
+
+
+def load_artifacts(out_dir):
+    """Читает каталог, собранный precompute(); ValueError, если формат другой."""
+    with open(os.path.join(out_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != ARTIFACTS_VERSION:
+        raise ValueError(f'{out_dir}: версия артефактов {manifest.get("version")}, '
+                         f'ожидается {ARTIFACTS_VERSION} — пересоберите командой python -m demography.precompute')
+    with open(os.path.join(out_dir, STATE_FILE), 'rb') as f:
+        state = pickle.load(f)
+    with open(os.path.join(out_dir, FIGURES_FILE), 'rb') as f:
+        figures = pickle.load(f)
+    return Precomputed(build_registry(manifest['registry'], out_dir), state, figures, manifest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m demography.precompute',
+        description='Предрасчёт данных, долей, рейтингов, корреляций, регрессий и фигур для приложения. '
+                    'Приложение берёт их из каталога, если задана переменная окружения DEMOGRAPHY_ARTIFACTS.'
+    )
+    parser.add_argument('out_dir', help='каталог для артефактов')
+    parser.add_argument('--registry', default=REGISTRY_PATH, help='реестр показателей (TOML)')
+    parser.add_argument('--data-dir', default=None, help='каталог с CSV (по умолчанию корень репозитория)')
+    parser.add_argument('--rating-size', type=int, default=DEFAULT_RATING_SIZE,
+                        help='пунктов в рейтинге для предрасчитанных фигур')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='процессов для построения фигур (по умолчанию — по числу ядер)')
+    args = parser.parse_args(argv)
+
+    log = lambda message: print(message, file=sys.stderr)
+    manifest = precompute(args.out_dir, load_registry(args.registry), args.data_dir,
+                          args.rating_size, args.jobs, log)
+    log(f'Готово: {args.out_dir} ({manifest["figures"]} фигур)')
+
+
+if __name__ == '__main__':
+    main()
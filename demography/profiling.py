@@ -0,0 +1,209 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Сколько последних замеров секции хранить для процентилей
+RECENT_SIZE = 256
+
+
+def percentile(values, q):
+    """Процентиль q (0..100) по отсортированной копии без интерполяции."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+class SectionProfiler:
+    """Время и выделения памяти по секциям приложения, общие для всех сессий процесса.
+
+    Для каждой секции копятся число вызовов, суммарное и максимальное время
+    (настенное и процессорное) и последние RECENT_SIZE длительностей для p50/p95.
+    Выделения памяти меряются, только если включён tracemalloc (см. set_tracing):
+    прирост текущей памяти и пик сверх начального уровня. tracemalloc общий на процесс,
+    поэтому при параллельных сессиях это оценка сверху.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    @staticmethod
+    def set_tracing(enabled):
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @staticmethod
+    def tracing():
+        return tracemalloc.is_tracing()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            alloc = peak = None
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                alloc, peak = current - start_memory, max(peak - start_memory, 0)
+            self.record(name, wall, cpu, alloc, peak)
+
+    def profiled(self, name):
+        """Декоратор: каждый вызов функции — замер секции name."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, wall, cpu=0.0, alloc=None, peak=None):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0, 'max_seconds': 0.0,
+                    'alloc_bytes': 0, 'peak_bytes': 0, 'traced_calls': 0,
+                    'recent': deque(maxlen=RECENT_SIZE),
+                }
+            stats['calls'] += 1
+            stats['seconds'] += wall
+            stats['cpu_seconds'] += cpu
+            stats['max_seconds'] = max(stats['max_seconds'], wall)
+            stats['recent'].append(wall)
+            if alloc is not None:
+                stats['traced_calls'] += 1
+                stats['alloc_bytes'] += alloc
+                stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+
+    def snapshot(self):
+        """{секция: сводка} — только числа, годится для JSON и таблицы."""
+        with self._lock:
+            items = [(name, dict(stats, recent=list(stats['recent']))) for name, stats in self._stats.items()]
+        result = {}
+        for name, stats in items:
+            recent = stats.pop('recent')
+            stats['mean_seconds'] = stats['seconds'] / stats['calls']
+            stats['p50_seconds'] = percentile(recent, 50)
+            stats['p95_seconds'] = percentile(recent, 95)
+            result[name] = stats
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started = time.time()
+
+    def to_json(self, gauges=None):
+        return json.dumps({'started': self.started, 'sections': self.snapshot(), 'gauges': gauges or {}},
+                          ensure_ascii=False, indent=1)
+
+    def to_prometheus(self, gauges=None, prefix='demography_section'):
+        """Текстовый формат экспозиции Prometheus; gauges — {имя метрики: число} процесса."""
+        metrics = [
+            ('calls_total', 'counter', 'Число выполнений секции', 'calls'),
+            ('seconds_total', 'counter', 'Суммарное время секции, с', 'seconds'),
+            ('cpu_seconds_total', 'counter', 'Суммарное процессорное время секции, с', 'cpu_seconds'),
+            ('seconds_max', 'gauge', 'Максимальное время секции, с', 'max_seconds'),
+            ('seconds_p95', 'gauge', 'p95 времени секции по последним вызовам, с', 'p95_seconds'),
+            ('alloc_bytes_total', 'counter', 'Прирост памяти за секцию (tracemalloc), байт', 'alloc_bytes'),
+            ('peak_bytes_max', 'gauge', 'Наибольший пик памяти секции (tracemalloc), байт', 'peak_bytes'),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for suffix, kind, help_text, field in metrics:
+            name = f'{prefix}_{suffix}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for section, stats in snapshot.items():
+                label = section.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{name}{{section="{label}"}} {stats[field]}')
+        for name, value in (gauges or {}).items():
+            if value is not None:
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, fmt='json', gauges=None):
+        """Пишет сводку в файл (json или prometheus) атомарной подменой."""
+        text = self.to_prometheus(gauges) if fmt == 'prometheus' else self.to_json(gauges)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        return path
+
+
+def process_memory():
+    """(текущий RSS, пиковый RSS) процесса в байтах; None, если узнать нельзя."""
+    current = peak = None
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024   # Linux: КБ
+    except (ImportError, OSError):
+        pass
+    return current, peak
+
+
+class SessionMeter:
+    """Память, которую держит каждая сессия сверх общих кэшей.
+
+    Скрипт сообщает о сессии на каждом запуске (observe): сколько байт лежит в её
+    session_state и сколько байт графиков и файлов ей отправлено за последний запуск
+    (эти копии Streamlit держит отдельно на каждую сессию). Сессии, которые
+    не появлялись дольше ttl секунд, считаются закрытыми и забываются.
+    """
+
+    def __init__(self, ttl=1800):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def observe(self, session_id, state_bytes, sent_bytes=0):
+        now = time.time()
+        with self._lock:
+            info = self._sessions.setdefault(session_id, {'runs': 0, 'started': now})
+            info['runs'] += 1
+            info['state_bytes'] = state_bytes
+            info['sent_bytes'] = sent_bytes
+            info['seen'] = now
+            for key in [key for key, value in self._sessions.items() if now - value['seen'] > self.ttl]:
+                del self._sessions[key]
+
+    def sessions(self):
+        with self._lock:
+            return {key: dict(value) for key, value in self._sessions.items()}
+
+    def summary(self):
+        sessions = list(self.sessions().values())
+        state = [info['state_bytes'] for info in sessions]
+        sent = [info['sent_bytes'] for info in sessions]
+        return {
+            'sessions': len(sessions),
+            'state_bytes_total': sum(state),
+            'state_bytes_max': max(state, default=0),
+            'sent_bytes_total': sum(sent),
+            'sent_bytes_max': max(sent, default=0),
+        }
@@ -0,0 +1,93 @@
+import numpy as np
+
+from .store import replace_rows
+
+
+def descending_order(values, axis):
+    """Индексы по убыванию значений вдоль axis (устойчиво, пропуски в конце)."""
+    keyed = np.where(np.isnan(values), np.inf, -values)
+    return np.argsort(keyed, axis=axis, kind='stable')
+
+
+def ascending_order(values, axis):
+    """Индексы по возрастанию значений вдоль axis (устойчиво, пропуски в конце)."""
+    keyed = np.where(np.isnan(values), np.inf, values)
+    return np.argsort(keyed, axis=axis, kind='stable')
+
+
+def ranks_from_order(order, valid, axis):
+    """Места 1..N по готовому порядку; для пропусков 0."""
+    shape = [1] * order.ndim
+    shape[axis] = order.shape[axis]
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(1, order.shape[axis] + 1).reshape(shape), axis=axis)
+    return np.where(valid, rank, 0).astype(np.int32)
+
+
+class RankIndex:
+    """Рейтинги пунктов по каждому показателю и году, построенные один раз на версию данных.
+
+    ``order[indicator, :, year]`` — индексы пунктов по убыванию значения (пропуски в конце),
+    ``ascending`` — то же по возрастанию (равные значения в обоих — в порядке файла),
+    ``rank[indicator, location, year]`` — место пункта (0, если значения нет),
+    ``counts[indicator, year]`` — сколько пунктов имеют значение.
+    Запросы топ-N, антирейтинга и места пункта — срезы этих массивов.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        for name, array in self._compute(store.values).items():
+            setattr(self, name, array)
+
+    @staticmethod
+    def _compute(values):
+        valid = ~np.isnan(values)
+        order = descending_order(values, axis=1).astype(np.int32)
+        return {
+            'counts': valid.sum(axis=1).astype(np.int32),
+            'order': order,
+            'ascending': ascending_order(values, axis=1).astype(np.int32),
+            'rank': ranks_from_order(order, valid, axis=1),
+        }
+
+    def updated(self, store, changed):
+        """Новый индекс для store, где пересортированы только показатели changed."""
+        if not store.extends(self.store):
+            return RankIndex(store)
+        rows = [store.indicator_id[name] for name in changed]
+        size = len(store.indicators)
+        result = object.__new__(RankIndex)
+        result.store = store
+        for name, block in self._compute(store.values[rows]).items():
+            setattr(result, name, replace_rows(getattr(self, name), rows, block, size=size))
+        return result
+
+    def _ids(self, indicator, year):
+        return self.store.indicator_id[indicator], self.store.year_id[year]
+
+    def top(self, indicator, year, n=5):
+        """Индексы n пунктов с наибольшими значениями (по убыванию)."""
+        i, y = self._ids(indicator, year)
+        return self.order[i, :min(n, self.counts[i, y]), y]
+
+    def bottom(self, indicator, year, n=5):
+        """Индексы n пунктов с наименьшими значениями (по возрастанию)."""
+        i, y = self._ids(indicator, year)
+        return self.ascending[i, :min(n, self.counts[i, y]), y]
+
+    def rank_of(self, indicator, location, year):
+        """(место пункта, число пунктов с данными); место 0 — данных нет."""
+        i, y = self._ids(indicator, year)
+        return int(self.rank[i, self.store.location_id[location], y]), int(self.counts[i, y])
+
+    def rank_history(self, indicator, location):
+        """Места пункта по всем годам (0 — нет данных за год)."""
+        return self.rank[self.store.indicator_id[indicator], self.store.location_id[location]]
+
+    def rank_change(self, indicator, location, year_from, year_to):
+        """Изменение места между годами (> 0 — пункт поднялся); None, если данных нет."""
+        history = self.rank_history(indicator, location)
+        before, after = history[self.store.year_id[year_from]], history[self.store.year_id[year_to]]
+        if before == 0 or after == 0:
+            return None
+        return int(before - after)
@@ -0,0 +1,68 @@
+import os
+import tomllib
+from dataclasses import dataclass
+
+from .loader import DATA_DIR
+
+# Реестр показателей по умолчанию (корень репозитория)
+REGISTRY_PATH = os.path.join(DATA_DIR, 'indicators.toml')
+KINDS = ('population', 'housing', 'investment')
+
+
+@dataclass(frozen=True)
+class Indicator:
+    """Описание показателя из реестра."""
+    name: str
+    file: str
+    kind: str
+    units: str
+    color: str
+    denominator: str = None   # показатель-знаменатель для долей (None — доли не считаются)
+    short: str = None         # короткое название для подсказок
+    default: bool = False     # выбран в боковой панели по умолчанию
+
+    @property
+    def label(self):
+        return f'{self.name} ({self.units})'
+
+
+def load_registry(path=REGISTRY_PATH):
+    """{название: Indicator} в порядке записей файла."""
+    with open(path, 'rb') as f:
+        entries = tomllib.load(f).get('indicator', [])
+    return build_registry(entries, path)
+
+
+def build_registry(entries, path='<реестр>'):
+    """{название: Indicator} из списка словарей (записей [[indicator]]).
+
+    Ошибки описания (неизвестный тип, повтор названия, знаменатель не из реестра)
+    выдаются сразу как ValueError, а не при первом обращении к показателю.
+    """
+    registry = {}
+    for entry in entries:
+        indicator = Indicator(**entry)
+        if indicator.kind not in KINDS:
+            raise ValueError(f'{path}: неизвестный тип показателя {indicator.kind!r} у {indicator.name!r}')
+        if indicator.name in registry:
+            raise ValueError(f'{path}: показатель {indicator.name!r} описан дважды')
+        registry[indicator.name] = indicator
+    for indicator in registry.values():
+        if indicator.denominator is not None and indicator.denominator not in registry:
+            raise ValueError(f'{path}: знаменатель {indicator.denominator!r} у {indicator.name!r} не описан')
+    return registry
+
+
+def of_kind(registry, kind):
+    """Названия показателей данного типа в порядке реестра."""
+    return [name for name, indicator in registry.items() if indicator.kind == kind]
+
+
+def defaults(registry):
+    """Показатели, выбранные по умолчанию, в порядке реестра."""
+    return [name for name, indicator in registry.items() if indicator.default]
+
+
+def denominators(registry):
+    """Знаменатели долей, упомянутые в реестре."""
+    return list(dict.fromkeys(i.denominator for i in registry.values() if i.denominator))
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .correlations import pairwise_moments, transpose_moments
+from .store import grow, replace_rows
+
+# Квантиль стандартного нормального распределения для 95% интервала
+Z_975 = 1.959963984540054
+
+
+# Точные квантили t(0.975) для малых df: разложение там ошибается на десятки процентов
+T_975 = np.array([np.nan, 12.706204736, 4.302652730, 3.182446305, 2.776445105, 2.570581836])
+
+
+def t_quantile(df, z=Z_975):
+    """Квантиль распределения Стьюдента уровня 0.975 (для z по умолчанию).
+
+    При df <= 5 берётся из таблицы T_975, дальше — разложение Корниша-Фишера:
+    его погрешность при df >= 6 меньше 0.06% — достаточно для полосы на графике, без scipy.
+    """
+    df = np.asarray(df, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expansion = (z
+                     + (z**3 + z) / (4 * df)
+                     + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+                     + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3))
+    if z != Z_975:
+        return expansion
+    small = (df >= 1) & (df < len(T_975)) & (df == np.floor(df))
+    exact = T_975[np.where(small, df, 0).astype(int)]
+    return np.where(small, exact, expansion)
+
+
+@dataclass(frozen=True)
+class LinearFit:
+    """Парная линейная регрессия y = slope * x + intercept в замкнутой форме."""
+    slope: float
+    intercept: float
+    r2: float
+    n: int
+    x_mean: float
+    x_ss: float        # Σ(x - x̄)²
+    resid_std: float   # стандартная ошибка остатков, ddof=2
+
+    def predict(self, x):
+        return self.slope * np.asarray(x, dtype=float) + self.intercept
+
+    def band(self, x):
+        """95% доверительная полоса для среднего отклика: (нижняя, верхняя)."""
+        x = np.asarray(x, dtype=float)
+        half = t_quantile(self.n - 2) * self.resid_std * np.sqrt(1 / self.n + (x - self.x_mean) ** 2 / self.x_ss)
+        y = self.predict(x)
+        return y - half, y + half
+
+
+def fit_arrays(mo):
+    """Параметры регрессии столбца j по строке i для всех пар (i, j) из pairwise_moments."""
+    n = mo['n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cxx = mo['sxx'] - mo['sx'] ** 2 / n
+        cyy = mo['syy'] - mo['sy'] ** 2 / n
+        cxy = mo['sxy'] - mo['sx'] * mo['sy'] / n
+        slope = cxy / cxx
+        x_mean = mo['sx'] / n + mo['cx']
+        y_mean = mo['sy'] / n + mo['cy']
+        intercept = y_mean - slope * x_mean
+        r2 = cxy ** 2 / (cxx * cyy)
+        sse = np.maximum(cyy - slope * cxy, 0)
+        resid_std = np.sqrt(sse / (n - 2))
+    ok = (n >= 3) & (cxx > 0)
+    nan = np.nan
+    return {
+        'slope': np.where(ok, slope, nan),
+        'intercept': np.where(ok, intercept, nan),
+        'r2': np.where(ok, r2, nan),
+        'n': n.astype(np.int32),
+        'x_mean': np.where(ok, x_mean, nan),
+        'x_ss': np.where(ok, cxx, nan),
+        'resid_std': np.where(ok, resid_std, nan),
+    }
+
+
+def fit_line(x, y):
+    """Регрессия по двум одномерным массивам (пары с пропусками отбрасываются)."""
+    arrays = fit_arrays(pairwise_moments(np.vstack([x, y]).astype(float)))
+    return LinearFit(**{name: value[0, 1].item() for name, value in arrays.items()})
+
+
+class RegressionTable:
+    """Линейные регрессии для всех пар показателей по каждому году и по всем годам.
+
+    Считается одним проходом по хранилищу на версию данных; fit() — выборка из массивов.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.by_year = fit_arrays(pairwise_moments(np.moveaxis(store.values, 2, 0)))
+        n_ind = store.values.shape[0]
+        self.pooled = fit_arrays(pairwise_moments(store.values.reshape(n_ind, -1)))
+
+    def updated(self, store, changed):
+        """Новая таблица для store: перестраиваются только пары с показателями changed."""
+        if not store.extends(self.store):
+            return RegressionTable(store)
+        rows = [store.indicator_id[name] for name in changed]
+        n_ind = store.values.shape[0]
+        result = object.__new__(RegressionTable)
+        result.store = store
+        for attr, values in (('by_year', np.moveaxis(store.values, 2, 0)),
+                             ('pooled', store.values.reshape(n_ind, -1))):
+            mo = pairwise_moments(values, rows)
+            as_x, as_y = fit_arrays(mo), fit_arrays(transpose_moments(mo))
+            fits = {}
+            for name, array in getattr(self, attr).items():
+                array = replace_rows(grow(array, n_ind, axis=-1), rows, as_x[name], axis=-2, size=n_ind)
+                array[..., :, rows] = as_y[name]
+                fits[name] = array
+            setattr(result, attr, fits)
+        return result
+
+    def fit(self, x_indicator, y_indicator, year=None):
+        """LinearFit для y_indicator по x_indicator; None, если точек для прямой мало."""
+        i, j = self.store.indicator_id[x_indicator], self.store.indicator_id[y_indicator]
+        if year is None:
+            values = {name: arr[i, j] for name, arr in self.pooled.items()}
+        else:
+            y = self.store.year_id[year]
+            values = {name: arr[y, i, j] for name, arr in self.by_year.items()}
+        if np.isnan(values['slope']):
+            return None
+        return LinearFit(**{name: value.item() for name, value in values.items()})
+
+
+def ols_summary(x, y):
+    """Полная OLS-сводка statsmodels (импортируется только по запросу)."""
+    import statsmodels.api as sm
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    model = sm.OLS(y[mask], sm.add_constant(x[mask])).fit()
+    return model.summary().as_text()
@@ -0,0 +1,73 @@
+import numpy as np
+
+from .ranks import descending_order, ranks_from_order
+from .store import replace_rows
+
+
+class ShareMatrix:
+    """Доли всех показателей от знаменателя по всем пунктам и годам.
+
+    Считается один раз на версию данных целыми массивами NumPy; графики долей
+    после этого только берут срезы:
+
+    - ``shares[indicator, location, year]`` — доля в процентах (округлена до 0.01,
+      при нулевом знаменателе 0);
+    - ``mask[indicator, location]`` — пункт есть и в показателе, и в знаменателе;
+    - ``mean[indicator, year]`` — среднее долей по пунктам из ``mask``;
+    - ``rank[indicator, location, year]`` — место по доле (1 — наибольшая), 0 если доли нет.
+    """
+
+    def __init__(self, store, denominator):
+        self.store = store
+        self.denominator = denominator
+        for name, array in self._compute(store, slice(None)).items():
+            setattr(self, name, array)
+
+    def _compute(self, store, rows):
+        """Массивы для показателей rows (срез или список индексов по первой оси)."""
+        values = store.values[rows]
+        den = store.values[store.indicator_id[self.denominator]][np.newaxis]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(den != 0, np.round(values / den * 100, 2), 0)
+        mask = ~np.isnan(values).all(axis=2) & store.present(self.denominator)[np.newaxis]
+
+        masked = np.where(mask[:, :, np.newaxis], shares, np.nan)
+        valid = ~np.isnan(masked)
+        counts = valid.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(counts > 0, np.nansum(masked, axis=1) / counts, np.nan)
+
+        # Места по убыванию доли; пропуски уходят в конец и получают 0
+        rank = ranks_from_order(descending_order(masked, axis=1), valid, axis=1)
+        return {'shares': shares, 'mask': mask, 'mean': mean, 'rank': rank}
+
+    def updated(self, store, changed):
+        """Новая матрица для store, где пересчитаны только показатели changed.
+
+        Изменение знаменателя или состава пунктов/лет требует полного пересчёта.
+        """
+        if self.denominator in changed or not store.extends(self.store):
+            return ShareMatrix(store, self.denominator)
+        rows = [store.indicator_id[name] for name in changed]
+        size = len(store.indicators)
+        result = object.__new__(ShareMatrix)
+        result.store, result.denominator = store, self.denominator
+        for name, block in self._compute(store, rows).items():
+            setattr(result, name, replace_rows(getattr(self, name), rows, block, size=size))
+        return result
+
+    def series(self, indicator, location):
+        """Доля показателя по годам для одного пункта."""
+        return self.shares[self.store.indicator_id[indicator], self.store.location_id[location]]
+
+    def ranked_column(self, indicator, year):
+        """Доли за год по пунктам из маски, по убыванию: (индексы пунктов, доли)."""
+        i, y = self.store.indicator_id[indicator], self.store.year_id[year]
+        idx = np.flatnonzero(self.mask[i])
+        ranks = self.rank[i, idx, y]
+        idx = idx[np.argsort(np.where(ranks > 0, ranks, len(self.store.locations) + 1), kind='stable')]
+        return idx, self.shares[i, idx, y]
+
+    def year_mean(self, indicator, year):
+        return self.mean[self.store.indicator_id[indicator], self.store.year_id[year]]
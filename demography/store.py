@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from demography.municipalities import MunicipalityIndex
+
+
+def is_year_column(col):
+    return col.isdigit() and len(col) == 4
+
+
+def grow(array, size, axis=0):
+    """Копия array, дополненная нулями по оси axis до длины size (для новых показателей)."""
+    pad = [(0, 0)] * array.ndim
+    pad[axis] = (0, max(size - array.shape[axis], 0))
+    return np.pad(array, pad)
+
+
+def replace_rows(array, rows, block, axis=0, size=None):
+    """Копия array, в которой строки rows по оси axis заменены на block.
+
+    size — новая длина оси, если показатели добавились (новые строки тоже в rows).
+    """
+    result = grow(array, size, axis) if size is not None else array.copy()
+    index = [slice(None)] * array.ndim
+    index[axis] = rows
+    result[tuple(index)] = block
+    return result
+
+
+class IndicatorStore:
+    """Колоночное хранилище: показатель × муниципалитет × год.
+
+    Все значения лежат в одном числовом массиве ``values[indicator, location, year]``,
+    а названия муниципалитетов и показателей переведены в целочисленные индексы,
+    поэтому выборка по пункту или по году — это срез массива, а не фильтр по строкам.
+    Пункты разных файлов сопоставляются по справочнику MunicipalityIndex: id пункта —
+    номер строки values, а разные написания одного названия ведут к одному id.
+    ``layouts[indicator]`` — (id пунктов в порядке строк файла, {год файла: тип столбца}),
+    по ним frame() восстанавливает таблицу показателя такой, какой она была загружена.
+    """
+
+    def __init__(self, indicators, locations, years, values, reports=None, municipalities=None,
+                 layouts=None):
+        self.indicators = list(indicators)
+        self.locations = list(locations)
+        self.municipalities = municipalities or MunicipalityIndex(self.locations)
+        self.years = list(years)
+        self.values = values
+        # Отчёты загрузки по показателям (кодировка, разделители, отвергнутые ячейки)
+        self.reports = reports or {}
+        self.layouts = layouts or {}
+        self.indicator_id = {name: i for i, name in enumerate(self.indicators)}
+        self.location_id = {name: i for i, name in enumerate(self.locations)}
+        self.year_id = {year: i for i, year in enumerate(self.years)}
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Собирает хранилище из словаря {показатель: широкий DataFrame с колонкой Name}."""
+        municipalities = MunicipalityIndex()
+        years = set()
+        cleaned = {}
+        reports = {}
+        for indicator, df in frames.items():
+            reports[indicator] = df.attrs.get('ingest', {})
+            df = df[df['Name'].notna() & (df['Name'] != '')]
+            rows = np.fromiter((municipalities.add(name) for name in df['Name']), dtype=np.intp, count=len(df))
+            # Повтор пункта (в том числе в другом написании) — берётся первая строка
+            first = ~pd.Series(rows).duplicated().to_numpy()
+            df, rows = df[first], rows[first]
+            year_columns = [col for col in df.columns if is_year_column(col)]
+            years.update(year_columns)
+            cleaned[indicator] = (df, rows, year_columns)
+
+        years = sorted(years, key=int)
+        year_id = {year: i for i, year in enumerate(years)}
+        values = np.full((len(frames), len(municipalities), len(years)), np.nan)
+        layouts = {}
+        for i, (indicator, (df, rows, year_columns)) in enumerate(cleaned.items()):
+            cols = [year_id[year] for year in year_columns]
+            # Столбцы лет уже числовые после загрузки (см. ingest.normalize_frame);
+            # float32 округляем до исходной точности, чтобы 30,70 не стало 30.700000762
+            block = df[year_columns].to_numpy(dtype=float)
+            decimals = df.attrs.get('ingest', {}).get('decimals')
+            if decimals is not None and (df[year_columns].dtypes == np.float32).any():
+                block = np.round(block, decimals)
+            values[i][np.ix_(rows, cols)] = block
+            layouts[indicator] = (rows, {year: df[year].dtype.name for year in year_columns})
+        return cls(cleaned.keys(), municipalities.names, years, values, reports, municipalities, layouts)
+
+    # --- Точечные выборки ---
+    def search(self, query, limit=None):
+        """Названия пунктов, подходящих под запрос (по началу, вхождению или нечётко)."""
+        return [self.locations[i] for i in self.municipalities.search(query, limit)]
+
+    def rows(self, indicators, locations):
+        """Срез values[показатели, пункты, годы] одной выборкой для нескольких пунктов."""
+        ind = [self.indicator_id[name] for name in indicators]
+        loc = [self.location_id[name] for name in locations]
+        return self.values[np.ix_(ind, loc, np.arange(len(self.years)))]
+
+    def series(self, indicator, location):
+        """Ряд значений показателя по всем годам для одного пункта."""
+        return self.values[self.indicator_id[indicator], self.location_id[location]]
+
+    def column(self, indicator, year):
+        """Значения показателя за год по всем пунктам (в порядке self.locations)."""
+        return self.values[self.indicator_id[indicator], :, self.year_id[year]]
+
+    def value(self, indicator, location, year):
+        return self.values[self.indicator_id[indicator], self.location_id[location], self.year_id[year]]
+
+    def extends(self, other):
+        """Те же пункты и годы, а показатели other — начало списка self.
+
+        Тогда производные массивы other можно обновить по частям: пересчитать
+        изменённые показатели и дописать добавленные.
+        """
+        return (self.indicators[:len(other.indicators)] == other.indicators
+                and self.locations == other.locations and self.years == other.years)
+
+    def present(self, indicator):
+        """Маска пунктов, для которых показатель есть хотя бы за один год."""
+        return ~np.isnan(self.values[self.indicator_id[indicator]]).all(axis=1)
+
+    def rejected_cells(self):
+        """Ячейки, которые не удалось разобрать как числа: [(показатель, Name, год, текст)]."""
+        return [(indicator, *cell) for indicator, report in self.reports.items()
+                for cell in report.get('rejected', [])]
+
+    # --- Табличные представления ---
+    def frame(self, indicator):
+        """Широкая таблица показателя (Name + годы), как после загрузки CSV.
+
+        Строки — в порядке файла, столбцы — только годы файла и в его типах (целые
+        остаются int32), отчёт загрузки — в df.attrs['ingest'].
+        """
+        rows, dtypes = self.layouts[indicator]
+        block = self.values[self.indicator_id[indicator]][rows]
+        df = pd.DataFrame({'Name': np.asarray(self.locations, dtype=object)[rows]})
+        for year, dtype in dtypes.items():
+            df[year] = block[:, self.year_id[year]].astype(dtype)
+        df.attrs['ingest'] = self.reports.get(indicator, {})
+        return df
@@ -0,0 +1,92 @@
+import glob
+import hashlib
+import os
+
+from .loader import DATA_DIR
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DataWatcher:
+    """Следит за файлами показателей в каталоге данных.
+
+    Дешёвая проверка — (размер, mtime); если они сдвинулись, изменение подтверждается
+    хэшем содержимого, так что простое касание файла ничего не пересчитывает.
+    С discover=True новые CSV в каталоге подхватываются как показатели с именем файла.
+
+    Новое состояние файлов запоминается только в commit(), после того как данные
+    загружены: файл, который не удалось прочитать, poll() вернёт снова.
+    """
+
+    def __init__(self, files, directory=DATA_DIR, discover=False):
+        self.files = dict(files)      # показатель -> имя файла
+        self.directory = directory
+        self.discover = discover
+        self._seen = {}               # показатель -> (размер, mtime_ns, хэш)
+        self._pending = {}            # то же для изменённых файлов до commit()
+
+    def current_files(self):
+        files = dict(self.files)
+        if self.discover:
+            known = set(files.values())
+            for path in sorted(glob.glob(os.path.join(self.directory, '*.csv'))):
+                file_name = os.path.basename(path)
+                if file_name not in known:
+                    files[os.path.splitext(file_name)[0]] = file_name
+        return files
+
+    def poll(self, indicators=None):
+        """Проверяет каталог: (изменённые или новые показатели, исчезнувшие показатели).
+
+        indicators — проверять только эти показатели (по умолчанию все известные).
+        Если нет файла из реестра — FileNotFoundError, какие бы показатели ни проверялись.
+        """
+        missing = [file_name for file_name in self.files.values()
+                   if not os.path.exists(os.path.join(self.directory, file_name))]
+        if missing:
+            raise FileNotFoundError(f'нет файлов показателей из реестра: {", ".join(missing)}')
+
+        files = self.current_files()
+        checked = list(files) if indicators is None else list(indicators)
+        changed = set()
+        present = set()
+        for indicator in checked:
+            file_name = files.get(indicator)
+            if file_name is None:
+                continue
+            path = os.path.join(self.directory, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            present.add(indicator)
+            previous = self._seen.get(indicator)
+            if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            digest = file_digest(path)
+            if previous is None or previous[2] != digest:
+                changed.add(indicator)
+                self._pending[indicator] = (stat.st_size, stat.st_mtime_ns, digest)
+            else:
+                # Файл только коснулись: содержимое прежнее
+                self._seen[indicator] = (stat.st_size, stat.st_mtime_ns, digest)
+
+        removed = (set(self._seen) & set(checked)) - present
+        return changed, removed
+
+    def commit(self, changed, removed=()):
+        """Запоминает состояние файлов, полученное poll(), после их успешной загрузки."""
+        for indicator in changed:
+            self._seen[indicator] = self._pending.pop(indicator)
+        for indicator in removed:
+            self._seen.pop(indicator, None)
+
+    def versions(self):
+        """Хэши содержимого по показателям — ключи кэшей, зависящих от конкретных файлов."""
+        return {indicator: seen[2] for indicator, seen in self._seen.items()}
@@ -1,25 +1,56 @@
-import base64  # Добавьте эту строку в начало файла, вместе с другими импортами
+import hmac
+import os
+import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import chardet
-from io import BytesIO
-import numpy as np
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from demography.assets import prepare_image, static_url, data_url, image_data_url
+from demography.dataset import Dataset
+from demography.export import csv_bytes, workbook_bytes, csv_zip_bytes, file_stem
+from demography.catalog import DEFAULT_RATING_SIZE, build_figure, figure_key
+from demography.figure_cache import FigureCache, ResultCache, approx_size
+from demography.forecast import METHODS as FORECAST_METHODS, projected_years
+from demography.precompute import load_artifacts
+from demography.profiling import SectionProfiler, SessionMeter, process_memory
+from demography.registry import load_registry, of_kind, defaults, denominators
+from demography.regression import ols_summary
 
 # --- Настройка страницы ---
 st.set_page_config(layout="wide", page_title="Демография Орловской области")
 
+# --- Профилирование: замеры секций копятся на процесс, по всем сессиям ---
+@st.cache_resource
+def get_profiler():
+    return SectionProfiler()
+
+# Память сессий сверх общих кэшей (session_state и отправленные им графики и файлы)
+@st.cache_resource
+def get_session_meter():
+    return SessionMeter()
+
+profiler = get_profiler()
+run_started = time.perf_counter()
+run_sent = {"bytes": 0}
+
+# --- Картинки: уменьшенный WebP, раздаётся статикой или закэшированным data URL ---
+@st.cache_resource
+def asset_url(image_path, max_width):
+    path = prepare_image(image_path, max_width)
+    if path is None:
+        # Файловая система только для чтения — картинка встраивается из памяти
+        return image_data_url(image_path, max_width)
+    if st.get_option("server.enableStaticServing"):
+        return static_url(path)
+    return data_url(path)
+
 # --- Функция для фона с оверлеем ---
 def set_custom_style(image_path, overlay_opacity=0.7):
-    with open(image_path, "rb") as f:
-        img_data = f.read()
-    img_base64 = base64.b64encode(img_data).decode("utf-8")
-    
+    # Стиль весит сотни байт: картинку браузер берёт по ссылке и кэширует
     css = f"""
     <style>
     .stApp {{
-        background-image: url("data:image/jpg;base64,{img_base64}");
+        background-image: url("{asset_url(image_path, 1920)}");
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
@@ -44,79 +75,113 @@ def set_custom_style(image_path, overlay_opacity=0.7):
     st.markdown(css, unsafe_allow_html=True)
 
 # Устанавливаем фон с оверлеем (opacity=0.85 - регулируемая прозрачность)
-set_custom_style("fon.jpg", overlay_opacity=0.85)
+with profiler.section("style"):
+    set_custom_style("fon.jpg", overlay_opacity=0.85)
 
 # --- Загрузка данных ---
-@st.cache_data
-def load_data(file_name):
-    with open(file_name, 'rb') as f:
-        result = chardet.detect(f.read(10000))
-    try:
-        df = pd.read_csv(file_name, sep=';', encoding=result['encoding'])
-    except UnicodeDecodeError:
-        try:
-            df = pd.read_csv(file_name, sep=';', encoding='utf-8')
-        except:
-            df = pd.read_csv(file_name, sep=';', encoding='cp1251')
-    
-    # Очистка данных
-    df = df.rename(columns=lambda x: x.strip())
-    if 'Наименование муниципального образования' in df.columns:
-        df = df.rename(columns={'Наименование муниципального образования': 'Name'})
-    df['Name'] = df['Name'].str.strip()
-    return df
-
-# Функция для определения доступных годов из данных
-def get_available_years(df_dict):
-    years = set()
-    for df, _ in df_dict.values():
-        year_columns = [col for col in df.columns if col.isdigit() and len(col) == 4]
-        years.update(year_columns)
-    return sorted(years, key=int)
-
-# Загрузка всех файлов
+# Каталог, собранный командой python -m demography.precompute: если задан, приложение
+# не читает CSV, а берёт данные, артефакты и готовые фигуры оттуда
+ARTIFACTS_DIR = os.environ.get("DEMOGRAPHY_ARTIFACTS")
+
+@st.cache_resource
+def get_precomputed():
+    return load_artifacts(ARTIFACTS_DIR)
+
+# Показатели описаны в indicators.toml: файл, единицы, тип, знаменатель долей, цвет
+@st.cache_resource
+def get_registry():
+    if ARTIFACTS_DIR:
+        return get_precomputed().registry
+    return load_registry()
+
+# Данные и все производные артефакты (доли, рейтинги, корреляции, регрессии) живут
+# в одном объекте на процесс. Файлы читаются только при первом обращении к показателю;
+# при каждом запуске скрипта загруженные файлы проверяются на изменения,
+# пересчитывается только то, что от них зависит
+@st.cache_resource
+def get_dataset():
+    if ARTIFACTS_DIR:
+        return Dataset.from_state(get_precomputed().state)
+    files = {name: indicator.file for name, indicator in get_registry().items()}
+    return Dataset(files, denominators(get_registry()), discover=True)
+
 try:
-    ch_1_6 = load_data('Ch_1_6.csv')
-    ch_3_18 = load_data('Ch_3_18.csv')
-    ch_5_18 = load_data('Ch_5_18.csv')
-    pop_3_79 = load_data('Pop_3_79.csv')
-    rpop = load_data('RPop.csv')
-    housing = load_data('housing.csv')
-    investment = load_data('Investment.csv')
+    with profiler.section("data_load"):
+        registry = get_registry()
+        dataset = get_dataset()
+        updated = dataset.refresh()
+        # Знаменатели нужны всегда: по ним боковая панель получает пункты и годы
+        dataset.require(*denominators(registry))
 except Exception as e:
     st.error(f"Ошибка загрузки данных: {str(e)}")
     st.stop()
 
-# Словари данных
-population_data_dict = {
-    "Дети 1-6 лет": (ch_1_6, "#1f77b4"),
-    "Дети 3-18 лет": (ch_3_18, "#ff7f0e"),
-    "Дети 5-18 лет": (ch_5_18, "#2ca02c"),
-    "Население 3-79 лет": (pop_3_79, "#d62728"),
-    "Среднегодовая численность": (rpop, "#9467bd")
-}
+if updated:
+    st.toast(f"Обновлены данные: {', '.join(sorted(updated))}")
+
+def require_data(*indicators):
+    """Загружает показатели по запросу; ошибка файла останавливает скрипт, как при первой загрузке."""
+    try:
+        return dataset.require(*indicators)
+    except Exception as e:
+        st.error(f"Ошибка загрузки данных: {str(e)}")
+        st.stop()
 
-housing_data = (housing, "#8c564b")
-investment_data = (investment, "#17becf")
+def data_key(*indicators):
+    """Версия содержимого файлов показателей — кэши зависят только от своих файлов."""
+    versions = dataset.state.versions
+    return tuple(versions.get(name) for name in indicators)
 
-available_years = get_available_years(population_data_dict)
+# Категории населения и цвета показателей из реестра
+population_topics = of_kind(registry, "population")
+HOUSING = of_kind(registry, "housing")[0]
+INVESTMENT = of_kind(registry, "investment")[0]
+
+store = dataset.state.store
+available_years = store.years
+# Сколько пунктов можно сравнивать одновременно
+COMPARISON_LIMIT = 10
 
 # --- Боковая панель с логотипом и настройками ---
 with st.sidebar:
     # Логотип с выравниванием по центру
     col1, col2, col3 = st.columns([1, 7, 1])
     with col2:
-        st.image("ogm.png", width=900)  # Ширину можно менять
+        st.markdown(
+            f'<img src="{asset_url("ogm.png", 600)}" style="width:100%">',  # Ширину можно менять
+            unsafe_allow_html=True
+        )
 
-    # Выбор населенного пункта
-    all_locations = ch_1_6['Name'].unique()
-    selected_location = st.selectbox("Населённый пункт:", all_locations, index=0)
+    # Выбор населенного пункта: поиск по началу названия, вхождению или с опечатками
+    all_locations = store.locations
+    location_query = st.text_input("Поиск пункта:", key="location_search", placeholder="Начните вводить название")
+    found_locations = store.search(location_query)
+    if not found_locations:
+        st.caption("Ничего не найдено — показаны все пункты")
+        found_locations = all_locations
+    selected_location = st.selectbox("Населённый пункт:", found_locations, index=0)
+    
+    # Режим сравнения: несколько пунктов на одних графиках
+    comparison_locations = ()
+    if st.checkbox("Сравнить несколько пунктов", key="compare_locations"):
+        # Выбор задаётся один раз при включении режима: default, меняющийся вместе
+        # с основным пунктом (или поиском), сбрасывал бы выбранные для сравнения пункты
+        st.session_state.setdefault("comparison_locations", [selected_location])
+        known = [name for name in st.session_state["comparison_locations"] if name in all_locations]
+        if len(known) != len(st.session_state["comparison_locations"]):
+            st.session_state["comparison_locations"] = known
+        comparison_locations = tuple(st.multiselect(
+            "Пункты для сравнения:",
+            all_locations,
+            max_selections=COMPARISON_LIMIT,
+            key="comparison_locations"
+        ))
     
     # Выбор категорий населения
     selected_topics = st.multiselect(
         "Категории населения:",
-        list(population_data_dict.keys()),
-        default=["Дети 1-6 лет", "Среднегодовая численность"]
+        population_topics,
+        default=defaults(registry)
     )
     
     # Анализ долей - ТОЛЬКО 1 КАТЕГОРИЯ, много не надо, путаются данные, и Юля тоже
@@ -124,7 +189,7 @@ with st.sidebar:
     st.title("Доля от общей численности")
     share_topic = st.selectbox(  # Изменено на selectbox вместо multiselect
         "Выберите категорию для анализа доли:",
-        [k for k in population_data_dict.keys() if k != "Среднегодовая численность"],
+        [k for k in population_topics if registry[k].denominator],
         index=0  # Первая категория выбрана по умолчанию
     )
     
@@ -135,12 +200,38 @@ with st.sidebar:
         index=len(available_years)-1
     )
     
+    # Размер рейтингов
+    rating_size = st.slider("Пунктов в рейтинге:", min_value=3, max_value=15, value=DEFAULT_RATING_SIZE)
+    
+    # Прогноз на несколько лет вперёд: строится сразу для всех пунктов на версию данных
+    forecast_method = forecast_year = None
+    if st.checkbox("Прогноз", key="forecast_show"):
+        forecast_method = st.selectbox(
+            "Метод прогноза:",
+            list(FORECAST_METHODS),
+            format_func=FORECAST_METHODS.get,
+            key="forecast_method"
+        )
+        forecast_years = projected_years(available_years)
+        forecast_year = st.selectbox("Год прогноза для рейтингов:", forecast_years,
+                                     index=len(forecast_years) - 1, key="forecast_year")
+    
+    # Анимация по диапазону лет: все кадры приходят одной фигурой, годы листает браузер
+    animation_years = None
+    if len(available_years) > 1 and st.checkbox("Анимация по годам", key="animate_years"):
+        first_year, last_year = st.select_slider(
+            "Диапазон лет:",
+            options=available_years,
+            value=(available_years[0], available_years[-1])
+        )
+        animation_years = tuple(available_years[available_years.index(first_year):available_years.index(last_year) + 1])
+    
     # Корреляция с жильем, зависит ли от наличия квадратнгых метров рождаемость
     st.markdown("---")
     st.title("Корреляция с жильем")
     correlation_topic_housing = st.selectbox(
         "Выберите категорию для корреляции:",
-        list(population_data_dict.keys()),
+        population_topics,
         index=0,
         key="housing_corr_select"
     )
@@ -150,67 +241,80 @@ with st.sidebar:
     st.title("Корреляция с инвестициями")
     correlation_topic_investment = st.selectbox(
         "Выберите категорию для корреляции:",
-        list(population_data_dict.keys()),
+        population_topics,
         index=0,
         key="investment_corr_select"
     )
 
-# --- Основной интерфейс ---
-st.title(f"📊 Демографические показатели: {selected_location}")
-
-# 1. ДИАГРАММА "СОЛНЕЧНЫЕ ЛУЧИ" (SUNBURST)
-if selected_topics and selected_year:
-    st.subheader(f"Иерархическая структура населения ({selected_year} год)")
-    
-    # Подготовка данных для sunburst
-    sunburst_data = {
-        'labels': [selected_location, *selected_topics],
-        'parents': ['', *[selected_location]*len(selected_topics)],
-        'values': [],
-        'textinfo': 'label+percent parent+value',
-        'marker': {'colors': []}
-    }
-    
-    # Получаем значения для каждого показателя
-    for topic in selected_topics:
-        df, color = population_data_dict[topic]
-        value = df[df['Name'] == selected_location][selected_year].values[0]
-        
-        # Обработка чисел в строковом формате (с запятыми)
-        if isinstance(value, str):
-            try:
-                value = float(value.replace(',', '.'))
-            except:
-                value = 0
-        
-        sunburst_data['values'].append(value)
-        sunburst_data['marker']['colors'].append(color)
-    
-    # Добавляем корневой элемент (общее значение)
-    sunburst_data['values'].insert(0, sum(sunburst_data['values']))
-    sunburst_data['marker']['colors'].insert(0, '#636EFA')  # Цвет для корневого элемента
-    
-    # Создаем диаграмму
-    fig = go.Figure(go.Sunburst(
-        labels=sunburst_data['labels'],
-        parents=sunburst_data['parents'],
-        values=sunburst_data['values'],
-        branchvalues="total",
-        marker=sunburst_data['marker'],
-        textinfo="label+percent parent+value",
-        hovertemplate='<b>%{label}</b><br>' +
-                     'Численность: %{value:,}<br>' +
-                     'Доля: %{percentParent:.1%}',
-        insidetextorientation='radial'
-    ))
-    
-    # Настраиваем внешний вид
-    fig.update_layout(
-        margin=dict(t=30, l=0, r=0, b=0),
-        height=600,
-        title_text=f"Структура населения в {selected_location} ({selected_year} год)",
-        title_x=0.5
+# Загружаем только то, что нужно выбранным секциям
+share_denominator = registry[share_topic].denominator if share_topic else None
+with profiler.section("data_require"):
+    require_data(
+        *selected_topics, *filter(None, [share_topic, share_denominator]),
+        correlation_topic_housing, HOUSING, correlation_topic_investment, INVESTMENT
     )
+state = dataset.state
+store, ranks = state.store, state.ranks
+
+with st.sidebar:
+    # Ячейки загруженных файлов, которые не удалось прочитать как числа
+    rejected = store.rejected_cells()
+    if rejected:
+        with st.expander(f"⚠️ Нераспознанные значения: {len(rejected)}"):
+            st.dataframe(
+                pd.DataFrame(rejected, columns=["Показатель", "Населённый пункт", "Год", "Значение"]),
+                hide_index=True
+            )
+    # Найденные в каталоге CSV, которые не удалось прочитать как показатель
+    if dataset.errors:
+        with st.expander(f"⚠️ Пропущенные файлы: {len(dataset.errors)}"):
+            for indicator, error in dataset.errors.items():
+                st.caption(f"{indicator}: {error}")
+
+# --- Секции: каждая пересчитывается только при смене своих входов ---
+# Скрипт перезапускается целиком при любом действии; секция берёт графики из общего
+# кэша по ключу своих входов, поэтому заново строится только то, чьи входы изменились
+
+# Общие для всех сессий LRU-кэши с лимитом памяти: сессии с одинаковыми пунктом,
+# годом и категориями получают один и тот же экземпляр результата
+FIGURE_CACHE_MB = int(os.environ.get("DEMOGRAPHY_FIGURE_CACHE_MB", 256))
+EXPORT_CACHE_MB = int(os.environ.get("DEMOGRAPHY_EXPORT_CACHE_MB", 128))
+MB = 2 ** 20
+
+@st.cache_resource
+def get_figure_cache():
+    # Предрасчитанные фигуры остаются JSON-строками и разбираются при первом показе:
+    # первый запуск не ждёт разбора всего каталога, а разобранные вытесняются по лимиту
+    precomputed = get_precomputed().figures if ARTIFACTS_DIR else None
+    return FigureCache(max_bytes=FIGURE_CACHE_MB * MB, precomputed=precomputed)
+
+@st.cache_resource
+def get_export_cache():
+    return ResultCache(max_bytes=EXPORT_CACHE_MB * MB)
+
+def cached_figure(kind, inputs):
+    """Фигура из общего кэша: одинаковые графики строятся один раз на процесс.
+
+    Вид графика и его зависимости описаны в demography.catalog: обновление файлов
+    других показателей запись не инвалидирует.
+    """
+    key = figure_key(kind, dataset.state.versions, registry, inputs)
+    cache = get_figure_cache()
+    fig = cache.get_or_build(key, lambda: build_figure(kind, dataset.state, registry, inputs))
+    # Длина JSON записи посчитана при построении — столько же уйдёт в браузер
+    run_sent["bytes"] += cache.sent_size(key)
+    return fig
+
+def show_figure(fig, **kwargs):
+    st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+@profiler.profiled("sunburst")
+def render_sunburst(location, year, topics):
+    # 1. ДИАГРАММА "СОЛНЕЧНЫЕ ЛУЧИ" (SUNBURST)
+    if not (topics and year):
+        return
+    st.subheader(f"Иерархическая структура населения ({year} год)")
+    fig = cached_figure("sunburst", (location, year, topics))
     
     # Добавляем пояснение
     st.markdown("""
@@ -223,301 +327,317 @@ if selected_topics and selected_year:
     </div>
     """, unsafe_allow_html=True)
     
-    st.plotly_chart(fig, use_container_width=True, key="sunburst_chart")
-# 2. График долей для выбранного пункта категории населения
-if share_topic and "Среднегодовая численность" in population_data_dict:  # Исправлено здесь
-    st.subheader(f"Доля от общей численности в {selected_location}")
-    fig_percent = go.Figure()
-    
-    rpop_data = population_data_dict["Среднегодовая численность"][0]  # Исправлено здесь
-    rpop_values = rpop_data[rpop_data['Name'] == selected_location][available_years].values.flatten()
-    
-    # Убрали цикл, так как теперь одна категория
-    df, color = population_data_dict[share_topic]
-    values = df[df['Name'] == selected_location][available_years].values.flatten()
-    
-    percentages = [round((v/rpop)*100, 2) if rpop !=0 else 0 
-                 for v, rpop in zip(values, rpop_values)]
-    
-    fig_percent.add_trace(go.Scatter(
-        x=available_years,
-        y=percentages,
-        name=f"{share_topic} (%)",
-        line=dict(color=color, width=3),
-        mode='lines+markers',
-        hovertemplate="<b>%{x}</b><br>%{y:.2f}%<extra></extra>"
-    ))
-    
-    fig_percent.update_layout(
-        xaxis_title="Год",
-        yaxis_title="Процент от общей численности",
-        hovermode="x unified",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02),
-        height=500,
-        template="plotly_white"
-    )
-    st.plotly_chart(fig_percent, use_container_width=True)
+    show_figure(fig, key="sunburst_chart")
 
-# 3. График долей по всем населённым пунктам
-if share_topic and "Среднегодовая численность" in population_data_dict:  # Исправлено здесь
-    st.subheader(f"Сравнение долей {share_topic} по населённым пунктам ({selected_year} год)")
-    
-    topic_df, topic_color = population_data_dict[share_topic]
-    rpop_df = population_data_dict["Среднегодовая численность"][0]
-    
-    merged = pd.merge(
-        topic_df[['Name', selected_year]],
-        rpop_df[['Name', selected_year]],
-        on='Name',
-        suffixes=('_cat', '_rpop')
-    )
-    merged['Доля (%)'] = (merged[f'{selected_year}_cat'] / merged[f'{selected_year}_rpop']) * 100
-    merged['Доля (%)'] = merged['Доля (%)'].round(2)
-    merged = merged.sort_values('Доля (%)', ascending=False)
-    
-    fig_all = px.bar(
-        merged,
-        x='Name',
-        y='Доля (%)',
-        color_discrete_sequence=[topic_color],
-        labels={'Name': 'Населённый пункт', 'Доля (%)': 'Доля (%)'},
-        height=600
-    )
-    
-    fig_all.update_layout(
-        xaxis_title="Населённый пункт",
-        yaxis_title=f"Доля {share_topic} от общей численности (%)",
-        xaxis={'categoryorder':'total descending'},
-        hovermode="x",
-        showlegend=False
-    )
-    
-    mean_val = merged['Доля (%)'].mean()
-    fig_all.add_hline(
-        y=mean_val,
-        line_dash="dot",
-        line_color="gray",
-        annotation_text=f"Среднее: {mean_val:.2f}%",
-        annotation_position="bottom right"
-    )
-    
-    st.plotly_chart(fig_all, use_container_width=True)
+@profiler.profiled("share_line")
+def render_share_line(location, topic, forecast=None):
+    # 2. График долей для выбранного пункта категории населения (forecast — метод прогноза)
+    denominator = registry[topic].denominator if topic else None
+    if denominator not in state.shares:
+        return
+    st.subheader(f"Доля от общей численности в {location}")
+    if forecast:
+        fig = cached_figure("share_line_forecast", (location, topic, forecast))
+    else:
+        fig = cached_figure("share_line", (location, topic))
+    show_figure(fig)
+
+@profiler.profiled("share_bar")
+def render_share_bar(year, topic, years=None):
+    # 3. График долей по всем населённым пунктам (years — кадры анимации по годам)
+    denominator = registry[topic].denominator if topic else None
+    if denominator not in state.shares:
+        return
+    if years:
+        st.subheader(f"Сравнение долей {topic} по населённым пунктам ({years[0]}–{years[-1]} годы)")
+        fig = cached_figure("share_bar_anim", (years, topic))
+    else:
+        st.subheader(f"Сравнение долей {topic} по населённым пунктам ({year} год)")
+        fig = cached_figure("share_bar", (year, topic))
+    show_figure(fig)
+
+def rank_caption(topic, location, year):
+    place, total = ranks.rank_of(topic, location, year)
+    if place == 0:
+        return f"{location}: нет данных за {year} год"
+    caption = f"{location}: {place} место из {total}"
+    change = ranks.rank_change(topic, location, available_years[0], year)
+    if change and year != available_years[0]:
+        caption += f" ({'+' if change > 0 else ''}{change} с {available_years[0]} года)"
+    return caption
 
-# 4. Рейтинги Топ-5
-if selected_topics:
-    st.subheader(f"Рейтинги населённых пунктов ({selected_year} год)")
+@profiler.profiled("ratings")
+def render_ratings(year, topics, location, n, forecast=None, forecast_year=None):
+    # 4. Рейтинги Топ-N (и по прогнозу на forecast_year, если выбран метод прогноза)
+    if not topics:
+        return
+    st.subheader(f"Рейтинги населённых пунктов ({year} год)")
     
-    for topic in selected_topics:
-        df, color = population_data_dict[topic]
-        
+    for topic in topics:
+        fig_top, fig_bottom = cached_figure("ratings", (year, topic, n))
+        st.caption(f"{topic} — {rank_caption(topic, location, year)}")
         col1, col2 = st.columns(2)
-        
         with col1:
-            top5 = df.nlargest(5, selected_year)[['Name', selected_year]].sort_values(selected_year)
-            fig_top = px.bar(
-                top5,
-                x=selected_year,
-                y='Name',
-                orientation='h',
-                title=f"🏆 Топ-5 по {topic}",
-                color_discrete_sequence=['#2ca02c'],
-                height=300
-            )
-            st.plotly_chart(fig_top, use_container_width=True)
-        
+            show_figure(fig_top)
         with col2:
-            bottom5 = df.nsmallest(5, selected_year)[['Name', selected_year]].sort_values(selected_year, ascending=False)
-            fig_bottom = px.bar(
-                bottom5,
-                x=selected_year,
-                y='Name',
-                orientation='h',
-                title=f"⚠️ Антирейтинг по {topic}",
-                color_discrete_sequence=['#d62728'],
-                height=300
-            )
-            st.plotly_chart(fig_bottom, use_container_width=True)
-
-# 5. Корреляция между выбранной категорией и жильем
-if correlation_topic_housing:
-    st.subheader(f"Корреляция между {correlation_topic_housing} и жилой площадью ({selected_year} год)")
+            show_figure(fig_bottom)
     
+    if not (forecast and forecast_year):
+        return
+    st.subheader(f"Прогноз рейтингов ({forecast_year} год, {FORECAST_METHODS[forecast].lower()})")
+    forecast_ranks = state.forecasts.ranks[forecast]
+    for topic in topics:
+        fig_top, fig_bottom = cached_figure("forecast_ratings", (forecast_year, topic, n, forecast))
+        place, total = forecast_ranks.rank_of(topic, location, forecast_year)
+        st.caption(f"{topic} — {location}: "
+                   + (f"{place} место из {total}" if place else "нет данных для прогноза"))
+        col1, col2 = st.columns(2)
+        with col1:
+            show_figure(fig_top)
+        with col2:
+            show_figure(fig_bottom)
+
+def render_correlation(name, topic, other, year, location, years=None, chart_key=None):
     try:
-        # Получаем данные для выбранной категории и жилья
-        topic_df, topic_color = population_data_dict[correlation_topic_housing]
-        housing_df, housing_color = housing_data
-        
-        # Объединяем данные, удаляем строки с пропущенными значениями
-        merged = pd.merge(
-            topic_df[['Name', selected_year]],
-            housing_df[['Name', selected_year]],
-            on='Name',
-            suffixes=('_pop', '_housing')
-        ).dropna()
-        
-         
+        if years:
+            fig = cached_figure("correlation_anim", (topic, other, years, location))
+        else:
+            fig = cached_figure("correlation", (topic, other, year, location))
         # Проверяем, что остались данные для анализа
-        if len(merged) < 2:
+        if fig is None:
             st.warning("Недостаточно данных для вычисления корреляции. Требуется минимум 2 точки.")
         else:
-            # Преобразуем данные в числовой формат
-            merged[f'{selected_year}_pop'] = pd.to_numeric(
-                merged[f'{selected_year}_pop'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
-            )
-            merged[f'{selected_year}_housing'] = pd.to_numeric(
-                merged[f'{selected_year}_housing'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
-            )
-            
-            # Удаляем строки с NaN после преобразования
-            merged = merged.dropna()
-            
-            if len(merged) < 2:
-                st.warning("После очистки данных осталось недостаточно точек для анализа.")
-            else:
-                # Рассчитываем корреляцию
-                corr = np.corrcoef(merged[f'{selected_year}_pop'], merged[f'{selected_year}_housing'])[0, 1]
-                
-                # Создаем график рассеяния
-                fig_corr = px.scatter(
-                    merged,
-                    x=f'{selected_year}_pop',
-                    y=f'{selected_year}_housing',
-                    hover_data=['Name'],
-                    labels={
-                        f'{selected_year}_pop': f'{correlation_topic_housing} (чел.)',
-                        f'{selected_year}_housing': 'Общая площадь жилья (кв.м/чел.)'
-                    },
-                    trendline="ols",
-                    color_discrete_sequence=[topic_color]
-                )
-                
-                # Добавляем информацию о корреляции
-                fig_corr.update_layout(
-                    title=f"Коэффициент корреляции: {corr:.2f}",
-                    height=600
-                )
-                
-                # Добавляем точку для выбранного населенного пункта
-                selected_data = merged[merged['Name'] == selected_location]
-                if not selected_data.empty:
-                    fig_corr.add_trace(go.Scatter(
-                        x=selected_data[f'{selected_year}_pop'],
-                        y=selected_data[f'{selected_year}_housing'],
-                        mode='markers',
-                        marker=dict(
-                            color='red',
-                            size=12,
-                            line=dict(width=2, color='black')
-                        ),
-                        name=f"Выбранный пункт: {selected_location}",
-                        hoverinfo='text',
-                        hovertext=f"{selected_location}<br>{correlation_topic_housing}: {selected_data[f'{selected_year}_pop'].values[0]:.2f}<br>Жилье: {selected_data[f'{selected_year}_housing'].values[0]:.2f}"
-                    ))
-                
-                st.plotly_chart(fig_corr, use_container_width=True)
-                
+            show_figure(fig, key=chart_key)
+            # Полная сводка statsmodels — только по запросу, модуль грузится лениво
+            if not years and st.checkbox("Подробная статистика регрессии (OLS)", key=f"{name}_ols"):
+                st.text(ols_summary(store.column(topic, year), store.column(other, year)))
     except Exception as e:
         st.error(f"Ошибка при вычислении корреляции: {str(e)}")
         st.write("Проверьте, что данные в файлах имеют правильный числовой формат.")
-# 6. Корреляция между выбранной категорией и инвестициями
-if correlation_topic_investment:
-    st.subheader(f"Корреляция между {correlation_topic_investment} и объемом инвестиций ({selected_year} год)")
+
+@profiler.profiled("housing_correlation")
+def render_housing_correlation(topic, year, location, years=None):
+    # 5. Корреляция между выбранной категорией и жильем
+    if not topic:
+        return
+    period = f"{years[0]}–{years[-1]} годы" if years else f"{year} год"
+    st.subheader(f"Корреляция между {topic} и жилой площадью ({period})")
+    render_correlation("housing_corr", topic, HOUSING, year, location, years)
+
+@profiler.profiled("investment_correlation")
+def render_investment_correlation(topic, year, location, years=None):
+    # 6. Корреляция между выбранной категорией и инвестициями
+    if not topic:
+        return
+    period = f"{years[0]}–{years[-1]} годы" if years else f"{year} год"
+    st.subheader(f"Корреляция между {topic} и объемом инвестиций ({period})")
+    render_correlation("investment_corr", topic, INVESTMENT, year, location, years,
+                       chart_key="investment_corr_chart")
+
+@profiler.profiled("comparison")
+def render_comparison(locations, year, topics, share_topic):
+    # Сравнение нескольких пунктов: категории за год и доли по годам
+    if not locations:
+        return
+    st.subheader(f"Сравнение пунктов ({len(locations)})")
+    if topics:
+        show_figure(cached_figure("comparison", (locations, year, topics)), key="comparison_chart")
+    if share_topic and registry[share_topic].denominator in state.shares:
+        show_figure(cached_figure("comparison_shares", (locations, share_topic)), key="comparison_shares_chart")
+
+@profiler.profiled("correlation_matrix")
+def render_correlation_matrix(year):
+    # 7. Матрица корреляций всех показателей
+    st.subheader("Матрица корреляций показателей")
+    # Матрице нужны все показатели — загружаем их только по запросу
+    if not st.checkbox("Показать матрицу по всем показателям", key="corr_matrix_show"):
+        return
+    indicators = dataset.available()
+    require_data(*indicators)
+    loaded = dataset.state.store.indicator_id
+    indicators = tuple(name for name in indicators if name in loaded)
+    pooled = st.checkbox("По всем годам сразу", key="corr_matrix_pooled")
+    matrix_year = None if pooled else year
+    fig = cached_figure("corr_matrix", (matrix_year, indicators))
+    show_figure(fig, key="corr_matrix_chart")
+
+# Файлы экспорта строятся только по запросу и кэшируются на версию данных
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# в общем кэше: все сессии получают один экземпляр bytes, а не копию каждая
+# (version — data_key выгружаемых показателей, он и делает запись кэша актуальной)
+def export_csv(version, topic):
+    return get_export_cache().get_or_build(
+        ("csv", version, topic),
+        lambda: csv_bytes(get_dataset().state.store.frame(topic))
+    )
+
+def export_excel(version, topics):
+    def build():
+        store = get_dataset().state.store
+        return workbook_bytes({topic: store.frame(topic) for topic in topics})
+    with st.spinner("Готовим Excel..."):
+        return get_export_cache().get_or_build(("xlsx", version, topics), build)
+
+def export_csv_zip(version):
+    def build():
+        store = get_dataset().state.store
+        return csv_zip_bytes({name: store.frame(name) for name in store.indicators})
+    with st.spinner("Готовим архив..."):
+        return get_export_cache().get_or_build(("zip", version), build)
+
+def download_button(data, **kwargs):
+    run_sent["bytes"] += len(data)
+    st.download_button(data=data, **kwargs)
+
+def lazy_download(label, key, build, **kwargs):
+    """Кнопка «подготовить», после нажатия — скачивание; build() не вызывается, пока файл не нужен."""
+    requested = st.session_state.setdefault("_export_requested", set())
+    if key not in requested:
+        if not st.button(f"⚙️ Подготовить: {label}", key=f"{key}_prepare"):
+            return
+        requested.add(key)
+    download_button(build(), label=label, key=key, **kwargs)
+
+@profiler.profiled("export")
+def render_export(topics):
+    # 8. Экспорт данных
+    st.subheader("📤 Экспорт данных")
+    exp_col1, exp_col2 = st.columns(2)
     
-    try:
-        topic_df, topic_color = population_data_dict[correlation_topic_investment]
-        investment_df, _ = investment_data
-        
-        merged = pd.merge(
-            topic_df[['Name', selected_year]],
-            investment_df[['Name', selected_year]],
-            on='Name',
-            suffixes=('_pop', '_investment')
-        ).dropna()
-        
-        if len(merged) < 2:
-            st.warning("Недостаточно данных для вычисления корреляции. Требуется минимум 2 точки.")
-        else:
-            merged[f'{selected_year}_pop'] = pd.to_numeric(
-                merged[f'{selected_year}_pop'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
+    for topic in topics:
+        with exp_col1:
+            download_button(
+                export_csv(data_key(topic), topic),
+                label=f"📄 {topic} (CSV)",
+                file_name=f"{file_stem(topic)}.csv",
+                mime="text/csv",
+                key=f"csv_{topic}"
             )
-            merged[f'{selected_year}_investment'] = pd.to_numeric(
-                merged[f'{selected_year}_investment'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
+        
+        with exp_col2:
+            lazy_download(
+                f"💾 {topic} (Excel)", f"excel_{topic}",
+                lambda: export_excel(data_key(topic), (topic,)),
+                file_name=f"{file_stem(topic)}.xlsx",
+                mime=XLSX_MIME
             )
-            
-            merged = merged.dropna()
-            
-            if len(merged) < 2:
-                st.warning("После очистки данных осталось недостаточно точек для анализа.")
-            else:
-                corr = np.corrcoef(merged[f'{selected_year}_pop'], merged[f'{selected_year}_investment'])[0, 1]
-                
-                fig_corr = px.scatter(
-                    merged,
-                    x=f'{selected_year}_pop',
-                    y=f'{selected_year}_investment',
-                    hover_data=['Name'],
-                    labels={
-                        f'{selected_year}_pop': f'{correlation_topic_investment} (чел.)',
-                        f'{selected_year}_investment': 'Объем инвестиций (руб./чел.)'
-                    },
-                    trendline="ols",
-                    color_discrete_sequence=[topic_color]
-                )
-                
-                fig_corr.update_layout(
-                    title=f"Коэффициент корреляции: {corr:.2f}",
-                    height=600
-                )
-                
-                selected_data = merged[merged['Name'] == selected_location]
-                if not selected_data.empty:
-                    fig_corr.add_trace(go.Scatter(
-                        x=selected_data[f'{selected_year}_pop'],
-                        y=selected_data[f'{selected_year}_investment'],
-                        mode='markers',
-                        marker=dict(
-                            color='red',
-                            size=12,
-                            line=dict(width=2, color='black')
-                        ),
-                        name=f"Выбранный пункт: {selected_location}",
-                        hoverinfo='text',
-                        hovertext=f"{selected_location}<br>{correlation_topic_investment}: {selected_data[f'{selected_year}_pop'].values[0]:.2f}<br>Инвестиции: {selected_data[f'{selected_year}_investment'].values[0]:.2f}"
-                    ))
-                
-                st.plotly_chart(fig_corr, use_container_width=True, key="investment_corr_chart")
-                
-    except Exception as e:
-        st.error(f"Ошибка при вычислении корреляции: {str(e)}")
-        st.write("Проверьте, что данные в файлах имеют правильный числовой формат.")
-# 7. Экспорт данных
-st.subheader("📤 Экспорт данных")
-exp_col1, exp_col2 = st.columns(2)
-
-for topic in selected_topics:
-    df, _ = population_data_dict[topic]
     
-    with exp_col1:
-        st.download_button(
-            label=f"📄 {topic} (CSV)",
-            data=df.to_csv(index=False).encode('utf-8'),
-            file_name=f"{topic.replace(' ', '_')}.csv",
-            mime="text/csv",
-            key=f"csv_{topic}"
+    # Все показатели одним файлом: перед сборкой загружаем все файлы
+    def all_indicators():
+        require_data(*dataset.available())
+        return tuple(dataset.state.store.indicators)
+
+    all_col1, all_col2 = st.columns(2)
+    with all_col1:
+        lazy_download(
+            "📦 Все показатели (Excel, лист на показатель)", "excel_all",
+            lambda: export_excel(data_key(*all_indicators()), all_indicators()),
+            file_name="Все_показатели.xlsx",
+            mime=XLSX_MIME
         )
-    
-    with exp_col2:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-        st.download_button(
-            label=f"💾 {topic} (Excel)",
-            data=output.getvalue(),
-            file_name=f"{topic.replace(' ', '_')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key=f"excel_{topic}"
+    with all_col2:
+        lazy_download(
+            "🗜️ Все показатели (ZIP с CSV)", "csv_zip_all",
+            lambda: export_csv_zip(data_key(*all_indicators())),
+            file_name="Все_показатели.zip",
+            mime="application/zip"
+        )
+
+# --- Основной интерфейс ---
+st.title(f"📊 Демографические показатели: {selected_location}")
+
+topics = tuple(selected_topics)
+render_comparison(comparison_locations, selected_year, topics, share_topic)
+render_sunburst(selected_location, selected_year, topics)
+render_share_line(selected_location, share_topic, forecast_method)
+render_share_bar(selected_year, share_topic, animation_years)
+render_ratings(selected_year, topics, selected_location, rating_size, forecast_method, forecast_year)
+render_housing_correlation(correlation_topic_housing, selected_year, selected_location, animation_years)
+render_investment_correlation(correlation_topic_investment, selected_year, selected_location, animation_years)
+render_correlation_matrix(selected_year)
+render_export(topics)
+
+profiler.record("script_run", time.perf_counter() - run_started)
+
+# Память этой сессии: session_state и байты графиков и файлов, отправленных за запуск
+run_ctx = get_script_run_ctx()
+get_session_meter().observe(
+    run_ctx.session_id if run_ctx else "local",
+    approx_size(dict(st.session_state)),
+    run_sent["bytes"]
+)
+
+# --- Скрытая панель профилирования: открывается по адресу ...?admin=<токен> ---
+# Токен задаётся переменной DEMOGRAPHY_ADMIN_TOKEN; без неё панель отключена: из неё
+# можно включить tracemalloc на весь процесс, сбросить замеры и писать файлы
+ADMIN_TOKEN = os.environ.get("DEMOGRAPHY_ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get("DEMOGRAPHY_PROFILE_DIR", "profiling")
+PROFILE_COLUMNS = {
+    "calls": "Вызовов",
+    "mean_seconds": "Среднее, с",
+    "p95_seconds": "p95, с",
+    "max_seconds": "Макс., с",
+    "seconds": "Всего, с",
+    "peak_kb": "Пик памяти, КБ",
+}
+
+def memory_gauges():
+    """Метрики памяти процесса: общие кэши, сессии, RSS."""
+    sessions = get_session_meter().summary()
+    rss, peak_rss = process_memory()
+    return {
+        "demography_figure_cache_bytes": get_figure_cache().stats()["bytes"],
+        "demography_export_cache_bytes": get_export_cache().stats()["bytes"],
+        "demography_sessions": sessions["sessions"],
+        "demography_session_state_bytes_total": sessions["state_bytes_total"],
+        "demography_session_state_bytes_max": sessions["state_bytes_max"],
+        "demography_session_sent_bytes_total": sessions["sent_bytes_total"],
+        "demography_session_sent_bytes_max": sessions["sent_bytes_max"],
+        "demography_process_rss_bytes": rss,
+        "demography_process_peak_rss_bytes": peak_rss,
+    }
+
+def render_admin_panel():
+    with st.sidebar.expander("🛠️ Профилирование секций", expanded=True):
+        tracing = st.checkbox(
+            "Замерять выделения памяти (tracemalloc, замедляет работу)",
+            value=profiler.tracing(), key="admin_tracing"
+        )
+        profiler.set_tracing(tracing)
+
+        stats = profiler.snapshot()
+        if stats:
+            table = pd.DataFrame(stats).T.sort_values("seconds", ascending=False)
+            table["peak_kb"] = table["peak_bytes"] / 1024
+            st.dataframe(table[list(PROFILE_COLUMNS)].rename(columns=PROFILE_COLUMNS))
+        gauges = memory_gauges()
+        for name, cache in (("Кэш фигур", get_figure_cache()), ("Кэш экспорта", get_export_cache())):
+            cache_stats = cache.stats()
+            st.caption(
+                f"{name}: {cache_stats['size']} записей, {cache_stats['bytes'] / MB:.1f} из "
+                f"{cache_stats['max_bytes'] / MB:.0f} МБ, попаданий {cache_stats['hit_rate']:.0%}, "
+                f"вытеснено {cache_stats['evictions']}"
+            )
+        st.caption(
+            f"Сессий: {gauges['demography_sessions']}, на сессию: session_state до "
+            f"{gauges['demography_session_state_bytes_max'] / 1024:.0f} КБ, отправлено до "
+            f"{gauges['demography_session_sent_bytes_max'] / MB:.1f} МБ за запуск"
         )
+        if gauges["demography_process_rss_bytes"]:
+            st.caption(f"Память процесса (RSS): {gauges['demography_process_rss_bytes'] / MB:.0f} МБ")
+
+        col1, col2, col3 = st.columns(3)
+        if col1.button("JSON", key="admin_dump_json"):
+            st.success(profiler.dump(os.path.join(PROFILE_DIR, "sections.json"), gauges=gauges))
+        if col2.button("Prometheus", key="admin_dump_prom"):
+            st.success(profiler.dump(os.path.join(PROFILE_DIR, "sections.prom"), fmt="prometheus", gauges=gauges))
+        if col3.button("Сбросить", key="admin_reset"):
+            profiler.reset()
+
+def admin_requested():
+    token = st.query_params.get("admin", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+if admin_requested():
+    render_admin_panel()
@@ -0,0 +1,44 @@
+"""Подготовка фоновой картинки: WebP в static/ или data URL из памяти."""
+import base64
+import io
+
+from PIL import Image
+
+from demography import assets
+
+IMAGE = 'fon.jpg'
+
+
+def test_prepare_image_writes_webp(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, 'STATIC_DIR', str(tmp_path / 'static'))
+    path = assets.prepare_image(IMAGE, 640)
+    with Image.open(path) as img:
+        assert (img.format, img.width) == ('WEBP', 640)
+    assert assets.prepare_image(IMAGE, 640) == path       # повторно не пережимается
+    assert path.endswith('fon-640-q75.webp')
+
+
+def test_prepare_image_keys_file_by_width_and_quality(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, 'STATIC_DIR', str(tmp_path / 'static'))
+    small = assets.prepare_image(IMAGE, 320)
+    large = assets.prepare_image(IMAGE, 640, quality=90)
+    assert small != large
+    with Image.open(small) as img:
+        assert img.width == 320
+    with Image.open(large) as img:
+        assert img.width == 640
+
+
+def test_read_only_directory_falls_back_to_data_url(tmp_path, monkeypatch):
+    # Каталог внутри обычного файла создать нельзя — как на read-only файловой системе
+    blocker = tmp_path / 'blocker'
+    blocker.write_bytes(b'')
+    monkeypatch.setattr(assets, 'STATIC_DIR', str(blocker / 'static'))
+    assert assets.prepare_image(IMAGE, 640) is None
+    assert list(tmp_path.iterdir()) == [blocker]
+
+    url = assets.image_data_url(IMAGE, 640)
+    prefix = 'data:image/webp;base64,'
+    assert url.startswith(prefix)
+    with Image.open(io.BytesIO(base64.b64decode(url[len(prefix):]))) as img:
+        assert img.width == 640
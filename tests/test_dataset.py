@@ -0,0 +1,65 @@
+"""Dataset: ошибки файлов реестра и найденных в каталоге CSV."""
+import pytest
+
+from demography.dataset import Dataset
+
+HEADER = 'Наименование муниципального образования;2019;2020\n'
+POPULATION = HEADER + 'г. Орел;310232;306267\nг. Ливны;47172;47092\n'
+HOUSING = HEADER + 'г. Орел;30,70;31,90\nг. Ливны;24,00;24,20\n'
+BROKEN = 'Год;Значение\n2019;1\n'        # нет столбца с названиями пунктов
+
+FILES = {'Население': 'pop.csv', 'Жильё': 'housing.csv'}
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / 'pop.csv').write_text(POPULATION, encoding='utf-8')
+    (tmp_path / 'housing.csv').write_text(HOUSING, encoding='utf-8')
+    return tmp_path
+
+
+def test_missing_registry_file_fails(directory):
+    (directory / 'housing.csv').unlink()
+    dataset = Dataset(FILES, ['Население'], directory=str(directory))
+    # Даже если показатель ещё не запрошен: без файла реестра приложение не стартует
+    with pytest.raises(FileNotFoundError, match='housing.csv'):
+        dataset.require('Население')
+
+
+def test_broken_registry_file_fails_until_fixed(directory):
+    dataset = Dataset(FILES, ['Население'], directory=str(directory))
+    dataset.require('Население', 'Жильё')
+    (directory / 'housing.csv').write_text(BROKEN, encoding='utf-8')
+    for _ in range(2):                              # не только первый refresh
+        with pytest.raises(ValueError):
+            dataset.refresh()
+    assert dataset.state.store.value('Жильё', 'г. Орел', '2019') == 30.7
+
+    (directory / 'housing.csv').write_text(HOUSING.replace('30,70', '33,30'), encoding='utf-8')
+    assert dataset.refresh() == {'Жильё'}
+    assert dataset.state.store.value('Жильё', 'г. Орел', '2019') == 33.3
+
+
+def test_failed_refresh_does_not_lose_other_changes(directory):
+    dataset = Dataset(FILES, ['Население'], directory=str(directory))
+    dataset.require('Население', 'Жильё')
+    (directory / 'pop.csv').write_text(POPULATION.replace('310232', '310000'), encoding='utf-8')
+    (directory / 'housing.csv').write_text(BROKEN, encoding='utf-8')
+    with pytest.raises(ValueError):
+        dataset.refresh()
+    (directory / 'housing.csv').write_text(HOUSING, encoding='utf-8')
+    assert dataset.refresh() == {'Население'}
+    assert dataset.state.store.value('Население', 'г. Орел', '2019') == 310000
+
+
+def test_broken_discovered_file_is_skipped(directory):
+    (directory / 'junk.csv').write_text(BROKEN, encoding='utf-8')
+    dataset = Dataset(FILES, ['Население'], directory=str(directory), discover=True)
+    dataset.require('Население', 'junk')
+    assert 'junk' in dataset.errors and 'junk' not in dataset.available()
+    assert dataset.refresh() == set()
+    assert 'junk' in dataset.errors                  # причина видна, пока файл не изменится
+
+    (directory / 'junk.csv').write_text(HOUSING, encoding='utf-8')
+    assert dataset.refresh() == {'junk'}
+    assert not dataset.errors
@@ -0,0 +1,171 @@
+"""Общие кэши результатов: лимит памяти, вытеснение и построение один раз на ключ."""
+import gc
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+from demography.figure_cache import FigureCache, ResultCache, approx_size, figure_json, json_size
+
+MB = 2 ** 20
+
+
+def in_threads(count, func):
+    """Вызывает func() в count потоках; возвращает результаты и исключения."""
+    results = []
+
+    def run():
+        try:
+            results.append(func())
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+class SlowBuild:
+    """build() для кэша: ждёт release и считает вызовы; первый вызов может упасть."""
+
+    def __init__(self, fail_first=False):
+        self.calls = 0
+        self.fail_first = fail_first
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait()
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError('сбой построения')
+        return ['результат']
+
+
+def finish(build, threads):
+    time.sleep(0.2)                    # остальные потоки успевают дойти до ожидания
+    build.release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_result_cache_evicts_least_recently_used_by_bytes():
+    value = b'x' * 1000
+    cache = ResultCache(max_bytes=3 * approx_size(value))
+    for key in 'abc':
+        cache.get_or_build(key, lambda: value)
+    cache.get_or_build('a', lambda: value)          # 'a' снова свежая
+    cache.get_or_build('d', lambda: value)
+    assert cache.stats()['evictions'] == 1 and cache.nbytes <= cache.max_bytes
+    rebuilt = []
+    for key in 'acdb':
+        cache.get_or_build(key, lambda: rebuilt.append(key) or value)
+    assert rebuilt == ['b']                         # вытеснена давнее всех использованная
+
+
+def test_result_cache_keeps_entry_larger_than_limit():
+    cache = ResultCache(max_bytes=100)
+    big = cache.get_or_build('big', lambda: b'x' * 1000)
+    assert cache.get_or_build('big', lambda: None) is big     # последняя запись не вытесняется
+    cache.get_or_build('a', lambda: 1)
+    assert cache.stats()['size'] == 1 and cache.stats()['evictions'] == 1
+
+
+def test_result_cache_maxsize_limits_count():
+    cache = ResultCache(max_bytes=float('inf'), maxsize=2)
+    for key in 'abc':
+        cache.get_or_build(key, lambda: key)
+    assert cache.stats()['size'] == 2 and cache.stats()['evictions'] == 1
+
+
+def test_result_cache_builds_once_per_key():
+    cache = ResultCache(max_bytes=MB)
+    build = SlowBuild()
+    threads, results = in_threads(8, lambda: cache.get_or_build('k', build))
+    finish(build, threads)
+    assert build.calls == 1
+    assert all(result is results[0] for result in results) and len(results) == 8
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 7)
+
+
+def test_result_cache_waiters_retry_failed_build():
+    cache = ResultCache(max_bytes=MB)
+    build = SlowBuild(fail_first=True)
+    threads, results = in_threads(4, lambda: cache.get_or_build('k', build))
+    finish(build, threads)
+    errors = [result for result in results if isinstance(result, RuntimeError)]
+    assert len(errors) == 1                         # исключение получает только строивший
+    assert build.calls == 2                         # один из ждавших построил заново
+    assert [result for result in results if result not in errors] == [['результат']] * 3
+    assert cache.get_or_build('k', build) == ['результат'] and build.calls == 2
+
+
+def bar_figure(seed, rows=30):
+    # Как сравнение долей по пунктам: столбец на пункт
+    values = np.random.default_rng(seed).random(rows)
+    return go.Figure(go.Bar(x=[f'Пункт {i}' for i in range(rows)], y=values.tolist()),
+                     layout=dict(title=f'График {seed}'))
+
+
+def traced_growth(cache, seeds):
+    """Прирост памяти (по tracemalloc) после построения фигур seeds через кэш."""
+    gc.collect()
+    before, _ = tracemalloc.get_traced_memory()
+    for seed in seeds:
+        cache.get_or_build(seed, lambda: bar_figure(seed))
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    return after - before
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_figure_size_is_memory_footprint(traced):
+    cache = FigureCache(max_bytes=float('inf'))
+    # Первые фигуры создают общие для процесса объекты plotly — их в замер не берём
+    traced_growth(cache, range(5))
+    charged = cache.nbytes
+    grown = traced_growth(cache, range(5, 45))
+    assert 0.8 * grown <= cache.nbytes - charged <= 1.25 * grown
+
+
+def test_max_bytes_bounds_memory(traced):
+    cache = FigureCache(max_bytes=MB)
+    traced_growth(cache, range(60))
+    assert cache.stats()['evictions'] > 0
+    # Заполненный кэш дальше не растёт: новые фигуры вытесняют старые
+    assert traced_growth(cache, range(100, 300)) < 0.1 * MB
+    assert cache.nbytes <= MB
+
+
+def test_sent_size_is_json_length():
+    cache = FigureCache(max_bytes=MB)
+    fig = cache.get_or_build('a', lambda: bar_figure(0))
+    assert cache.sent_size('a') == json_size(figure_json(fig))
+    assert cache.sent_size('b') == 0
+
+
+def test_precomputed_figures_are_parsed_on_request():
+    specs = {seed: figure_json(bar_figure(seed)) for seed in range(20)}
+    cache = FigureCache(max_bytes=MB // 2, precomputed=specs)
+    assert cache.stats()['size'] == 0                 # при создании ничего не разбирается
+
+    def build():
+        raise AssertionError('предрасчитанная фигура не строится заново')
+
+    fig = cache.get_or_build(3, build)
+    assert fig.to_dict() == bar_figure(3).to_dict()
+    assert cache.sent_size(3) == len(specs[3])
+    assert cache.get_or_build(3, build) is fig
+    # Разобранные фигуры вытесняются по лимиту, как построенные
+    for seed in specs:
+        cache.get_or_build(seed, build)
+    assert cache.nbytes <= MB // 2 and cache.stats()['evictions'] > 0
@@ -0,0 +1,113 @@
+"""Инкрементальные updated() производных артефактов совпадают с построением с нуля."""
+import numpy as np
+import pytest
+
+from demography.correlations import CorrelationMatrix
+from demography.dataset import Dataset
+from demography.forecast import ForecastTable
+from demography.loader import data_path, load_data
+from demography.ranks import RankIndex
+from demography.registry import denominators, load_registry
+from demography.regression import RegressionTable
+from demography.shares import ShareMatrix
+from demography.store import IndicatorStore
+
+REGISTRY = load_registry()
+DENOMINATOR = denominators(REGISTRY)[0]
+# Без знаменателя нельзя построить доли, поэтому он загружается первым
+NAMES = [DENOMINATOR] + [name for name in REGISTRY if name != DENOMINATOR]
+ARTIFACTS = {
+    'shares': lambda store: ShareMatrix(store, DENOMINATOR),
+    'ranks': RankIndex,
+    'correlations': CorrelationMatrix,
+    'regressions': RegressionTable,
+    'forecasts': ForecastTable,
+}
+
+
+@pytest.fixture(scope='module')
+def frames():
+    return {name: load_data(REGISTRY[name].file, use_snapshot=False) for name in NAMES}
+
+
+def build(frames, names):
+    return IndicatorStore.from_frames({name: frames[name] for name in names})
+
+
+def modified(df, factor):
+    df = df.copy()
+    year = [col for col in df.columns if col.isdigit()][-1]
+    df[year] = df[year] * factor
+    return df
+
+
+def assert_same(actual, expected, path='artifact'):
+    """Поэлементное сравнение атрибутов (массивы — с точностью до округления)."""
+    if isinstance(expected, IndicatorStore):
+        assert actual.indicators == expected.indicators, path
+        assert actual.locations == expected.locations, path
+        assert actual.years == expected.years, path
+        assert_same(actual.values, expected.values, f'{path}.values')
+    elif isinstance(expected, dict):
+        assert actual.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f'{path}[{key!r}]')
+    elif isinstance(expected, np.ndarray):
+        assert actual.shape == expected.shape, path
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=path)
+    elif hasattr(expected, '__dict__'):
+        for name, value in vars(expected).items():
+            if name != 'store' and not name.startswith('_'):
+                assert_same(getattr(actual, name), value, f'{path}.{name}')
+    else:
+        assert actual == expected, path
+
+
+@pytest.mark.parametrize('kind', ARTIFACTS)
+def test_append(frames, kind):
+    old, new = build(frames, NAMES[:3]), build(frames, NAMES)
+    artifact = ARTIFACTS[kind]
+    assert_same(artifact(old).updated(new, set(NAMES[3:])), artifact(new), kind)
+
+
+@pytest.mark.parametrize('kind', ARTIFACTS)
+@pytest.mark.parametrize('changed', [NAMES[2], DENOMINATOR])
+def test_modify(frames, kind, changed):
+    old = build(frames, NAMES)
+    new = IndicatorStore.from_frames({
+        name: modified(frames[name], 1.5) if name == changed else frames[name] for name in NAMES
+    })
+    artifact = ARTIFACTS[kind]
+    assert_same(artifact(old).updated(new, {changed}), artifact(new), kind)
+
+
+@pytest.mark.parametrize('kind', ARTIFACTS)
+def test_remove(frames, kind):
+    old, new = build(frames, NAMES), build(frames, NAMES[:2] + NAMES[3:])
+    artifact = ARTIFACTS[kind]
+    assert_same(artifact(old).updated(new, set()), artifact(new), kind)
+
+
+def test_dataset_refresh_matches_fresh_build(tmp_path, frames):
+    files = {name: REGISTRY[name].file for name in NAMES}
+    for file_name in files.values():
+        with open(data_path(file_name), 'rb') as f:
+            (tmp_path / file_name).write_bytes(f.read())
+
+    dataset = Dataset(files, [DENOMINATOR], directory=str(tmp_path))
+    dataset.require(*NAMES[:3])
+    dataset.require(*NAMES[3:])
+    # Меняем первое значение последней строки одного файла: перечитывается только он
+    path = tmp_path / files[NAMES[4]]
+    lines = path.read_bytes().splitlines()
+    lines[-1] = lines[-1].replace(b';', b';1', 1)
+    path.write_bytes(b'\r\n'.join(lines) + b'\r\n')
+    assert dataset.refresh() == {NAMES[4]}
+
+    fresh = Dataset(files, [DENOMINATOR], directory=str(tmp_path))
+    fresh.require(*NAMES)
+    for kind in ARTIFACTS:
+        actual, expected = getattr(dataset.state, kind), getattr(fresh.state, kind)
+        if kind == 'shares':
+            actual, expected = actual[DENOMINATOR], expected[DENOMINATOR]
+        assert_same(actual, expected, kind)
@@ -0,0 +1,100 @@
+"""Определение разделителей и разбор чисел в выгрузках."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from demography.ingest import (compact_dtype, count_decimals, detect_separators, normalize_frame,
+                               normalize_numeric)
+from demography.loader import parse_csv
+
+
+@pytest.mark.parametrize('cells, expected', [
+    (['30,70', '12,5', '7'], (',', '.')),            # десятичная запятая (российские выгрузки)
+    (['30.70', '12.5', '7'], ('.', ',')),            # десятичная точка
+    (['1.234,5', '2,5'], (',', '.')),                # обе: десятичный — правый
+    (['1,234.5', '2.5'], ('.', ',')),
+    (['1,234', '5,678'], (',', '.')),                # без точек запятая — десятичная
+    (['1,234', '2.5'], ('.', ',')),                  # есть точки: "1,234" — разряды
+    (['1.234.567', '3'], (',', '.')),                # несколько точек — разряды
+    (['1 234 567', '12'], ('.', ',')),               # пробелы в разрядах не мешают
+    (['17997', '2908'], ('.', ',')),                 # только целые
+])
+def test_detect_separators(cells, expected):
+    assert detect_separators(cells) == expected
+
+
+def parse(cells, decimal, thousands):
+    numbers, rejected = normalize_numeric(pd.Series(cells, dtype=object), decimal, thousands)
+    return numbers.tolist(), rejected.tolist()
+
+
+def test_grouped_thousands_are_stripped():
+    numbers, rejected = parse(['1,234', '1,234,567.5', '-2,500', '12.25', '1 234'], '.', ',')
+    assert numbers == [1234, 1234567.5, -2500, 12.25, 1234]
+    assert not any(rejected)
+
+
+def test_misgrouped_thousands_are_rejected():
+    # "1,5" в файле с десятичной точкой — не 15, а нераспознанная ячейка
+    numbers, rejected = parse(['1,5', '1,23', '12,3456', '1,234'], '.', ',')
+    assert np.isnan(numbers[:3]).all() and numbers[3] == 1234
+    assert rejected == [True, True, True, False]
+
+
+def test_comma_decimal_file():
+    numbers, rejected = parse(['30,70', '1.234,5', '1.5', '', 'н/д'], ',', '.')
+    assert numbers[:2] == [30.7, 1234.5]
+    assert np.isnan(numbers[2:]).all()
+    assert rejected == [False, False, True, False, True]
+
+
+def test_normalize_frame_reports_rejected_cells():
+    df = pd.DataFrame({'Name': ['г. Орел', 'г. Ливны'], '2020': ['1.25', '1,5'], '2021': ['3', '4']})
+    df, report = normalize_frame(df, ['2020', '2021'])
+    assert (report['decimal'], report['thousands'], report['decimals']) == ('.', ',', 2)
+    assert report['rejected'] == [['г. Ливны', '2020', '1,5']]
+    assert df['2021'].dtype == np.int32
+
+
+def test_parse_csv_mixes_read_csv_and_text_columns(tmp_path):
+    # 2020 разбирает read_csv, в 2021 разряды и текст — этот столбец доразбирается построчно
+    path = tmp_path / 'housing.csv'
+    path.write_text('Наименование муниципального образования;2020;2021;Примечание\n'
+                    'г. Орел;30,70;1.234,5;а, б\n'
+                    'г. Ливны;;н/д;\n'
+                    ';1;2;\n', encoding='cp1251')
+    df = parse_csv(str(path))
+    assert df['Name'].tolist() == ['г. Орел', 'г. Ливны']
+    assert df['Примечание'].tolist() == ['а, б', '']
+    assert np.isnan(df['2020'][1]) and df['2021'][0] == 1234.5 and np.isnan(df['2021'][1])
+    report = df.attrs['ingest']
+    assert (report['decimal'], report['decimals'], report['encoding']) == (',', 1, 'windows-1251')
+    assert report['rejected'] == [['г. Ливны', '2021', 'н/д']]
+
+
+@pytest.mark.parametrize('values, decimals', [
+    ([310232, 2.0 ** 40, np.nan], 0),
+    ([30.7, 31.9, 12], 1),                         # "30,70" в файле — тоже один знак
+    ([0.05, 1234.5, -2.25], 2),
+    ([0.1 + 0.2], 17),                             # 0.30000000000000004
+])
+def test_count_decimals(values, decimals):
+    assert count_decimals(np.array(values)) == decimals
+
+
+@pytest.mark.parametrize('values, decimals, dtype', [
+    ([1, 2, 3], 0, np.int32),
+    ([1, np.nan], 0, np.float32),
+    ([2.0 ** 25, np.nan], 0, np.float64),
+    ([30.7, 12.5], 1, np.float32),
+    ([12345678.91, 1.5], 2, np.float64),           # float32 дал бы 12345679.0
+    ([83886.08, 1.5], 2, np.float64),              # 83886.08 · 100 ≥ 2^23
+    ([83886.07, 1.5], 2, np.float32),
+])
+def test_compact_dtype(values, decimals, dtype):
+    numbers = pd.Series(values, dtype=float)
+    assert compact_dtype(numbers, decimals) == dtype
+    if dtype == np.float32:
+        # Округление до decimals знаков восстанавливает исходные значения
+        restored = np.round(numbers.astype(np.float32).astype(float), decimals)
+        np.testing.assert_array_equal(restored, numbers)
@@ -0,0 +1,63 @@
+"""Ключи сопоставления названий и поиск по справочнику муниципалитетов."""
+import pytest
+
+from demography.municipalities import MunicipalityIndex, normalize_name, repair_mojibake
+
+NAMES = ['г. Орел', 'г. Ливны', 'г. Мценск', 'Орловский муниципальный район',
+         'Мценский муниципальный район', 'Болховский муниципальный район']
+
+
+@pytest.mark.parametrize('variant, canonical', [
+    ('г.Орел', 'г. Орел'),
+    ('  г. Орел ', 'г. Орел'),
+    ('Г. ОРЕЛ', 'г. Орел'),
+    ('Город Орёл', 'г. Орел'),
+    ('город  Орел', 'г. Орел'),
+    ('г Орел', 'г. Орел'),
+    ('«г. Орел»', 'г. Орел'),
+    ('Орловский р-н', 'Орловский муниципальный район'),
+    ('орловский район', 'Орловский муниципальный район'),
+    ('Орловский м.р.', 'Орловский муниципальный район'),
+    ('Орловский  муниципальный район', 'Орловский муниципальный район'),
+    ('г. Орел'.encode('utf-8').decode('cp1251'), 'г. Орел'),      # UTF-8, прочитанный как cp1251
+    ('г. Орел'.encode('cp1251').decode('latin-1'), 'г. Орел'),    # cp1251, прочитанный как latin-1
+])
+def test_normalize_name_variants(variant, canonical):
+    assert normalize_name(variant) == normalize_name(canonical)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('г. Мценск', 'Мценский муниципальный район'),
+    ('г. Орел', 'Орловский муниципальный район'),
+    ('Мценский муниципальный район', 'Мценский муниципальный округ №2'),
+])
+def test_normalize_name_keeps_different_places_apart(a, b):
+    assert normalize_name(a) != normalize_name(b)
+
+
+def test_repair_mojibake_leaves_correct_names():
+    for name in NAMES:
+        assert repair_mojibake(name) == name
+
+
+def test_index_aliases_share_id():
+    index = MunicipalityIndex(NAMES)
+    assert index.add('Город Орёл') == index.resolve('г. Орел') == 0
+    assert index.names[0] == 'г. Орел'          # для показа — первое написание
+    assert len(index) == len(NAMES)
+    assert index.resolve('Знаменский муниципальный район') is None
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', NAMES),
+    ('орел', ['г. Орел']),                                          # без "г."
+    ('мцен', ['г. Мценск', 'Мценский муниципальный район']),       # в порядке справочника
+    ('район', ['Орловский муниципальный район', 'Мценский муниципальный район',
+               'Болховский муниципальный район']),
+    ('мценкий', ['Мценский муниципальный район', 'г. Мценск']),     # опечатка
+    ('Ливни', ['г. Ливны']),
+    ('xyz', []),
+])
+def test_search(query, expected):
+    index = MunicipalityIndex(NAMES)
+    assert [index.names[i] for i in index.search(query)] == expected
@@ -0,0 +1,38 @@
+"""Рейтинги из RankIndex совпадают с nlargest/nsmallest, включая равные значения."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from demography.figures import rating_figures
+from demography.ranks import RankIndex
+from demography.store import IndicatorStore
+
+NAMES = ['г. Орел', 'г. Ливны', 'г. Мценск', 'Орловский муниципальный район',
+         'Мценский муниципальный район', 'Болховский муниципальный район',
+         'Знаменский муниципальный район']
+FRAME = pd.DataFrame({
+    'Name': NAMES,
+    '2022': [5, 1, 3, 3, 9, 1, 1],            # равные значения на границе топ-5 и антирейтинга
+    '2023': [2, np.nan, 2, 8, 2, np.nan, 7],
+})
+
+
+@pytest.fixture
+def ranks():
+    return RankIndex(IndicatorStore.from_frames({'Жильё': FRAME}))
+
+
+@pytest.mark.parametrize('year', ['2022', '2023'])
+@pytest.mark.parametrize('n', [1, 3, 5])
+def test_top_and_bottom_match_pandas(ranks, year, n):
+    names = np.asarray(ranks.store.locations, dtype=object)
+    assert list(names[ranks.top('Жильё', year, n)]) == FRAME.nlargest(n, year)['Name'].tolist()
+    assert list(names[ranks.bottom('Жильё', year, n)]) == FRAME.nsmallest(n, year)['Name'].tolist()
+
+
+def test_rating_figures_keep_file_order_for_ties(ranks):
+    fig_top, fig_bottom = rating_figures(ranks, '2022', 'Жильё')
+    assert list(fig_top.data[0].y) == ['г. Ливны', 'г. Мценск', 'Орловский муниципальный район',
+                                       'г. Орел', 'Мценский муниципальный район']
+    assert list(fig_bottom.data[0].y) == ['г. Мценск', 'Орловский муниципальный район', 'г. Ливны',
+                                          'Болховский муниципальный район', 'Знаменский муниципальный район']
@@ -0,0 +1,36 @@
+"""Регрессия в замкнутой форме и квантили Стьюдента для доверительной полосы."""
+import numpy as np
+import pytest
+
+from demography.regression import fit_line, t_quantile
+
+# Квантили t(0.975) из таблиц (scipy.stats.t.ppf)
+T_TABLE = {1: 12.7062047, 2: 4.3026527, 3: 3.1824463, 4: 2.7764451, 5: 2.5705818,
+           6: 2.4469119, 8: 2.3060041, 10: 2.2281389, 20: 2.0859634, 100: 1.9839715}
+
+
+@pytest.mark.parametrize('df', T_TABLE)
+def test_t_quantile(df):
+    assert t_quantile(df) == pytest.approx(T_TABLE[df], rel=1e-3)
+
+
+def test_t_quantile_vectorized():
+    df = np.array(list(T_TABLE))
+    np.testing.assert_allclose(t_quantile(df), list(T_TABLE.values()), rtol=1e-3)
+
+
+def test_fit_line_matches_polyfit():
+    x = np.array([1, 2, 3, 4, 5, np.nan, 7])
+    y = np.array([2.1, 3.9, 6.2, 7.8, 10.1, 11, np.nan])
+    fit = fit_line(x, y)
+    slope, intercept = np.polyfit(x[:5], y[:5], 1)
+    assert (fit.slope, fit.intercept) == pytest.approx((slope, intercept))
+    assert fit.n == 5
+
+
+def test_band_uses_exact_quantile_for_three_points():
+    x, y = np.array([0., 1, 2]), np.array([0., 2, 1])
+    fit = fit_line(x, y)
+    low, high = fit.band([fit.x_mean])
+    half = T_TABLE[1] * fit.resid_std * np.sqrt(1 / 3)
+    assert (high[0] - low[0]) / 2 == pytest.approx(half, rel=1e-6)
@@ -0,0 +1,33 @@
+"""Колоночное хранилище: таблицы показателей для выгрузки совпадают с загруженными."""
+import numpy as np
+
+from demography.export import csv_bytes
+from demography.loader import load_data
+from demography.store import IndicatorStore
+
+HEADER = 'Наименование муниципального образования'
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8')
+    return load_data(str(path), use_snapshot=False)
+
+
+def test_frame_matches_ingested_table(tmp_path):
+    population = write_csv(tmp_path / 'pop.csv', f'{HEADER};2019;2020\n'
+                           'г. Орел;310232;306267\nг. Ливны;47172;47092\n')
+    housing = write_csv(tmp_path / 'housing.csv', f'{HEADER};2020;2021\n'
+                        'г. Ливны;24,20;24,60\nг.Орел;31,90;\nг. Мценск;28,10;28,50\n')
+    store = IndicatorStore.from_frames({'Население': population, 'Жильё': housing})
+    assert store.years == ['2019', '2020', '2021']
+
+    frame = store.frame('Население')
+    assert list(frame.columns) == ['Name', '2019', '2020']       # только годы файла
+    assert (frame.dtypes[['2019', '2020']] == np.int32).all()
+    assert csv_bytes(frame).decode('utf-8').splitlines()[1] == 'г. Орел,310232,306267'
+
+    frame = store.frame('Жильё')
+    assert list(frame.columns) == ['Name', '2020', '2021']
+    assert frame['Name'].tolist() == ['г. Ливны', 'г. Орел', 'г. Мценск']   # порядок строк файла
+    assert csv_bytes(frame).decode('utf-8').splitlines()[1:3] == ['г. Ливны,24.2,24.6', 'г. Орел,31.9,']
+    assert frame.attrs['ingest']['decimal'] == ','